@@ -0,0 +1,139 @@
+"""Benchmark yt-dlp extraction in thread mode vs process mode.
+
+Runs the same batch of extractions through the bot's ExtractionExecutor in each
+mode and reports wall time, per-call latency and event-loop lag (the delay a
+gateway heartbeat or voice packet would see while extraction is running).
+
+Usage:
+    python scripts/bench_extraction.py [--workers 4] [--rounds 2] [URL ...]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from music import ytdl_jobs  # noqa: E402
+from music.extraction_executor import ExtractionExecutor  # noqa: E402
+from music.ytdl_jobs import YDL_PROFILES  # noqa: E402
+
+DEFAULT_TARGETS = [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=9bZkp7q19f0",
+    "https://www.youtube.com/watch?v=kJQP7kiw5Fk",
+    "https://www.youtube.com/watch?v=JGwWNGJdvx8",
+    "https://www.youtube.com/watch?v=RgKAFK5djSk",
+    "https://www.youtube.com/watch?v=OPf0YbXqDm0",
+    "https://www.youtube.com/watch?v=fRh_vgS2dFE",
+    "https://www.youtube.com/watch?v=hT_nvWreIhg",
+]
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _monitor_loop_lag(samples, stop, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        before = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - before - interval))
+
+
+def _build_executor(mode, workers, cachedir):
+    if mode == "process":
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=ytdl_jobs.init_worker,
+            initargs=(YDL_PROFILES, cachedir),
+        )
+        return ExtractionExecutor(max_workers=workers, pool=pool)
+    ytdl_jobs.configure(YDL_PROFILES, cachedir)
+    return ExtractionExecutor(max_workers=workers)
+
+
+async def _run_mode(mode, targets, workers, rounds, cachedir):
+    executor = _build_executor(mode, workers, cachedir)
+    warmups = workers if mode == "process" else 1
+    await asyncio.gather(*(executor.submit(ytdl_jobs.warm) for _ in range(warmups)))
+
+    latencies = []
+    failures = 0
+
+    async def _one(target):
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            result = await executor.submit(ytdl_jobs.extract_track, target)
+            if not result:
+                failures += 1
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - started)
+
+    lag_samples = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(lag_samples, stop))
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(_one(target) for target in targets))
+    wall = time.perf_counter() - started
+    stop.set()
+    await monitor
+    executor.shutdown()
+
+    return {
+        "mode": mode,
+        "calls": len(latencies),
+        "failures": failures,
+        "wall": wall,
+        "lat_p50": statistics.median(latencies) if latencies else 0.0,
+        "lat_p90": _percentile(latencies, 0.9),
+        "lag_p99": _percentile(lag_samples, 0.99),
+        "lag_max": max(lag_samples) if lag_samples else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--modes", nargs="+", default=["thread", "process"])
+    parser.add_argument(
+        "--cachedir", default=os.path.join(ROOT_DIR, "cache", "yt-dlp")
+    )
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        print(f"Running {mode} mode...", flush=True)
+        results.append(
+            await _run_mode(mode, args.targets, args.workers, args.rounds, args.cachedir)
+        )
+
+    header = f"{'mode':<8} {'calls':>5} {'fail':>4} {'wall s':>8} {'p50 s':>7} {'p90 s':>7} {'lag p99 ms':>11} {'lag max ms':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['mode']:<8} {r['calls']:>5} {r['failures']:>4} {r['wall']:>8.2f} "
+            f"{r['lat_p50']:>7.2f} {r['lat_p90']:>7.2f} "
+            f"{r['lag_p99'] * 1000:>11.1f} {r['lag_max'] * 1000:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
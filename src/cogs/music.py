@@ -1,45 +1,131 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import re
 import datetime
 import yt_dlp as youtube_dl
 import os
-import json
 from cogs.admin import is_admin
-import functools
 from logger import get_logger
 import asyncio
-from db import get_music_channels
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from db import (
+    find_track_by_query,
+    forget_track_query,
+    get_music_channels,
+    get_music_sessions,
+    get_music_settings,
+    get_track_metadata,
+    replace_music_sessions,
+    upsert_music_settings,
+    upsert_track_metadata,
+)
+from music.track_cache import (
+    FORMAT,
+    TIMEOUT,
+    NegativeTrackCache,
+    TrackFailedError,
+    TrackInfoCache,
+    cache_key_for_target,
+    classify_extraction_error,
+    inflight_key_for_target,
+    stream_url_expiry,
+    track_metadata,
+)
+from music import ytdl_jobs
+from music.ytdl_jobs import YDL_PROFILES
+from music.extraction_executor import HIGH, LOW, ExtractionExecutor
+from music.playlist_stream import PlaylistStream
+from music.track_queue import Track, TrackQueue
+from music.guild_player import (
+    IDLE,
+    LOADING,
+    PAUSED,
+    PLAYING,
+    GuildPlayer,
+    PlayerContext,
+    PlayerRegistry,
+)
+from music.audio import FFmpegTrackSource, RingBufferedSource
+from music.ffmpeg_supervisor import FFmpegSupervisor
+from music.opus_cache import OpusDiskCache
+from music.settings_store import GuildSettingsStore
+from music.hedging import HedgePolicy
+from music.search_view import SearchResultsView
 
 youtube_dl.utils.bug_reports_message = lambda *args, **kwargs: ""
 
-# Updated YDL_OPTIONS with better format selection and error handling
-YDL_OPTIONS = {
-    "format": "bestaudio[ext=webm]/bestaudio[ext=m4a]/bestaudio/best",
-    "noplaylist": False,
-    "quiet": True,
-    "force-ipv4": True,
-    "extract_flat": "in_playlist",
-    "ignoreerrors": True,
-    "nocheckcertificate": True,
-    "extractor_retries": 3,
-    "skip_download": True,
-    "no_warnings": True,
-    # Remove complex format_sort that might be causing issues
-    # YouTube specific options - simplified
-    "youtube_include_dash_manifest": False,
-    "prefer_free_formats": True,
-    # Add cookies support if needed
-    "cookiefile": None,
-    # Add user agent
-    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-}
-
-# Updated FFMPEG options with better reconnect handling
-FFMPEG_OPTIONS = {
-    "before_options": "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -reconnect_at_eof 1",
-    "options": "-vn -bufsize 512k -maxrate 128k",
-}
+_project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Persistent yt-dlp cache so player-JS decryption survives restarts.
+YTDL_CACHE_DIR = os.getenv("MUSIC_YTDL_CACHE_DIR") or os.path.join(
+    _project_root, "cache", "yt-dlp"
+)
+
+# Dedicated extraction workers shared by the interactive and background lanes.
+EXTRACTION_WORKERS = int(os.getenv("MUSIC_EXTRACTION_WORKERS", "4"))
+# "thread" runs yt-dlp on threads in the bot process; "process" moves it to a
+# pool of pre-warmed worker processes so its CPU work can't stall the event loop.
+EXTRACTION_MODE = os.getenv("MUSIC_EXTRACTION_MODE", "thread").strip().lower()
+
+# Queued tracks only get stream URLs once they enter the prefetch window at the
+# head of the queue; up to PLAYLIST_CONCURRENCY of them resolve at once per guild.
+PREFETCH_WINDOW = max(1, int(os.getenv("MUSIC_PREFETCH_WINDOW", "3")))
+PLAYLIST_CONCURRENCY = max(1, int(os.getenv("MUSIC_PLAYLIST_CONCURRENCY", "4")))
+# Playlists are enumerated as a stream of pages; 0 disables the entry cap.
+PLAYLIST_MAX_ENTRIES = max(0, int(os.getenv("MUSIC_PLAYLIST_MAX_ENTRIES", "5000")))
+PLAYLIST_FIRST_PAGE_TIMEOUT = 60.0
+
+# Overall deadline for resolving one track (queueing plus extraction).
+TRACK_EXTRACT_DEADLINE = float(os.getenv("MUSIC_TRACK_EXTRACT_DEADLINE", "45"))
+# Interactive extractions slower than the observed p90 race a second attempt
+# through the "track_hedge" profile; the first success wins.
+HEDGE_EXTRACTION = os.getenv("MUSIC_HEDGE_EXTRACTION", "1").strip().lower() not in ("0", "false", "no")
+
+# Resolved-track cache tuning; entries expire with their googlevideo stream URL.
+TRACK_CACHE_SIZE = int(os.getenv("MUSIC_TRACK_CACHE_SIZE", "512"))
+TRACK_CACHE_TTL = float(os.getenv("MUSIC_TRACK_CACHE_TTL", "1800"))
+TRACK_REFRESH_MARGIN = float(os.getenv("MUSIC_TRACK_REFRESH_MARGIN", "600"))
+
+# Tracks are written to an Opus disk cache while they play; replays read the file.
+OPUS_CACHE_DIR = os.getenv("MUSIC_OPUS_CACHE_DIR") or os.path.join(
+    _project_root, "cache", "opus"
+)
+OPUS_CACHE_MAX_MB = max(0, int(os.getenv("MUSIC_OPUS_CACHE_MAX_MB", "2048")))
+# Livestreams (no duration) and very long uploads are never written to disk.
+OPUS_CACHE_MAX_TRACK_SECONDS = 2 * 60 * 60
+
+# "opus" sends ffmpeg's Opus packets straight to Discord (stream copy for Opus
+# sources at 100% volume); "pcm" decodes to PCM and scales volume in Python.
+PLAYBACK_MODE = os.getenv("MUSIC_PLAYBACK_MODE", "opus").strip().lower()
+# Opus sources above this bitrate are re-encoded rather than passed through.
+OPUS_PASSTHROUGH_MAX_KBPS = 192
+# Seconds of audio read ahead of the voice send loop to ride out ffmpeg/network stalls.
+READAHEAD_SECONDS = max(0.2, float(os.getenv("MUSIC_READAHEAD_SECONDS", "5")))
+# The next track's ffmpeg is spawned and primed this many seconds before the
+# current one ends (0 disables).
+PRESPAWN_SECONDS = max(0.0, float(os.getenv("MUSIC_PRESPAWN_SECONDS", "5")))
+
+# Global cap on concurrent ffmpeg processes (0 = unlimited); spawns beyond it wait
+# up to FFMPEG_SLOT_TIMEOUT seconds for a free slot.
+FFMPEG_MAX_PROCESSES = max(0, int(os.getenv("MUSIC_FFMPEG_MAX_PROCESSES", "0")))
+FFMPEG_SLOT_TIMEOUT = 30.0
+FFMPEG_SWEEP_INTERVAL = 10.0
+# ffmpeg processes owned by no voice client or pre-spawn for this long are killed.
+FFMPEG_ORPHAN_GRACE = 30.0
+# A playing ffmpeg that uses no CPU while its read-ahead buffer is empty for this
+# long is stuck (e.g. a hung stream) and is killed so the player can move on.
+FFMPEG_STALL_GRACE = 30.0
+
+# Playback auto-pauses when no listeners are left in the voice channel; after this
+# many seconds with nobody listening or nothing playing the bot leaves (0 = stay).
+IDLE_TIMEOUT = max(0.0, float(os.getenv("MUSIC_IDLE_TIMEOUT", "300")))
+IDLE_CHECK_INTERVAL = 15.0
+
+# Queues, current tracks and positions are snapshotted this often (and on
+# shutdown) and resumed after a restart; 0 disables session persistence.
+SESSION_SNAPSHOT_INTERVAL = max(0.0, float(os.getenv("MUSIC_SESSION_SNAPSHOT_INTERVAL", "60")))
 
 
 class MusicCommands(commands.Cog):
@@ -47,27 +133,101 @@ class MusicCommands(commands.Cog):
         self.bot = bot
         self.logger = get_logger()
         script_dir = os.path.dirname(os.path.abspath(__file__))
+        # Imported into the settings store once, then renamed to volumes.json.imported.
         self.volumes_file = os.path.join(script_dir, "..", "volumes.json")
-        if os.path.exists(self.volumes_file):
-            try:
-                with open(self.volumes_file, "r") as f:
-                    self.volumes = json.load(f)
-            except Exception as e:
-                self.logger.error(f"Error loading volumes file: {e}")
-                self.volumes = {}
-        else:
-            self.volumes = {}
-        self.queues = {}
-        self.current_tracks = {}
-        self.loading_queues = {}
-        self.loading_tasks = {}
-        self.loading_locks = {}
-        self.play_next_events = {}
-        self.is_seeking = {}
-        self.playback_start_time = {}
-        self.playback_seek_position = {}
-        self.pause_start_time = {}
+        self.settings = GuildSettingsStore(
+            get_music_settings, upsert_music_settings, logger=self.logger
+        )
+        # Per-guild queue, playback and background-task state.
+        self.players = PlayerRegistry()
+        self.restore_task = None
+        # Snapshots only start once stored sessions were restored, so they can't be wiped.
+        self.sessions_restored = False
+        self.mp_manager = None
         self.allowed_channels_cache = {}
+        self.track_cache = TrackInfoCache(
+            max_entries=TRACK_CACHE_SIZE,
+            default_ttl=TRACK_CACHE_TTL,
+            refresh_margin=TRACK_REFRESH_MARGIN,
+        )
+        self.refresh_tasks = {}
+        # Targets that recently failed to extract, with their failure class.
+        self.negative_cache = NegativeTrackCache()
+        self.hedge_policy = HedgePolicy()
+        # Single-flight map: concurrent requests for one target share one extraction.
+        self.inflight_extractions = {}
+        # key -> executor jobs of that extraction, so a high-lane joiner can promote them
+        self.inflight_jobs = {}
+        self.inflight_stats = {"started": 0, "coalesced": 0, "promoted": 0}
+        self.metadata_tasks = set()
+        self.opus_cache = OpusDiskCache(OPUS_CACHE_DIR, OPUS_CACHE_MAX_MB * 1024 * 1024)
+        self.readahead_totals = {"tracks": 0, "underruns": 0, "stall_seconds": 0.0}
+        self.prespawn_stats = {"spawned": 0, "used": 0, "discarded": 0}
+        # Seconds between a track ending and the next one starting.
+        self.transition_gaps = deque(maxlen=256)
+        self.transition_stats = {"count": 0, "total": 0.0, "max": 0.0}
+        self.ffmpeg_supervisor = FFmpegSupervisor(
+            FFMPEG_MAX_PROCESSES, FFMPEG_ORPHAN_GRACE, FFMPEG_STALL_GRACE
+        )
+        if EXTRACTION_MODE == "process":
+            # In-process pool stays unused; each worker builds its own at start-up.
+            self.ydl_pool = None
+            worker_pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=ytdl_jobs.init_worker,
+                initargs=(YDL_PROFILES, YTDL_CACHE_DIR),
+            )
+            self.extraction = ExtractionExecutor(
+                max_workers=EXTRACTION_WORKERS, pool=worker_pool
+            )
+        else:
+            self.ydl_pool = ytdl_jobs.configure(YDL_PROFILES, YTDL_CACHE_DIR)
+            self.extraction = ExtractionExecutor(max_workers=EXTRACTION_WORKERS)
+
+    async def cog_load(self):
+        await self.settings.load(legacy_path=self.volumes_file)
+        self.supervise_ffmpeg.start()
+        if IDLE_TIMEOUT > 0:
+            self.disconnect_idle.start()
+        if SESSION_SNAPSHOT_INTERVAL > 0:
+            self.restore_task = self.bot.loop.create_task(self._restore_sessions())
+        # Process mode: one concurrent warm-up per worker so every process is spawned now.
+        warmups = EXTRACTION_WORKERS if EXTRACTION_MODE == "process" else 1
+        try:
+            if EXTRACTION_MODE == "process":
+                # Shared queues for streaming playlist pages out of worker processes
+                self.mp_manager = await self.bot.loop.run_in_executor(
+                    None, multiprocessing.get_context("spawn").Manager
+                )
+            await asyncio.gather(
+                *(self.extraction.submit(ytdl_jobs.warm) for _ in range(warmups))
+            )
+            self.logger.info(
+                f"yt-dlp extraction ready in {EXTRACTION_MODE} mode ({EXTRACTION_WORKERS} workers)."
+            )
+        except Exception as e:
+            self.logger.warning(f"Failed to pre-warm yt-dlp instances: {e}")
+
+    async def cog_unload(self):
+        if self.supervise_ffmpeg.is_running():
+            self.supervise_ffmpeg.cancel()
+        if self.disconnect_idle.is_running():
+            self.disconnect_idle.cancel()
+        if self.restore_task and not self.restore_task.done():
+            self.restore_task.cancel()
+        if self.snapshot_sessions.is_running():
+            self.snapshot_sessions.cancel()
+        if self.sessions_restored:
+            await self._save_sessions()
+        for player in self.players:
+            self._dispose_player(player.guild_id, "unload")
+        await self.settings.close()
+        self.extraction.shutdown()
+        if self.ydl_pool:
+            self.ydl_pool.close()
+        if self.mp_manager:
+            self.mp_manager.shutdown()
 
     async def _get_allowed_channels(self, guild_id: str):
         """Fetch allowed text channels for music commands, cached per guild."""
@@ -101,15 +261,254 @@ class MusicCommands(commands.Cog):
         raise error
 
     def get_guild_queue(self, gid):
-        if gid not in self.queues:
-            self.queues[gid] = []
-        if gid not in self.loading_queues:
-            self.loading_queues[gid] = []
-        if gid not in self.loading_locks:
-            self.loading_locks[gid] = asyncio.Lock()
-        if gid not in self.play_next_events:
-            self.play_next_events[gid] = asyncio.Event()
-        return self.queues[gid]
+        return self.players.ensure(gid).queue
+
+    def _dispose_player(self, gid: str, reason: str):
+        """Drop all of a guild's music state: tasks, playlist stream, queue and pre-spawn."""
+        player = self.players.pop(gid)
+        if player is None:
+            return
+        held = player.close()
+        if held is not None:
+            self.prespawn_stats["discarded"] += 1
+            self.bot.loop.run_in_executor(None, held.cleanup)
+        self.logger.info(f"Disposed music player for GID {gid} ({reason}).")
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        if member.id == self.bot.user.id:
+            if before.channel and after.channel is None:
+                self._dispose_player(str(member.guild.id), "voice disconnect")
+                return
+        elif before.channel == after.channel:
+            return  # mute/deafen/stream changes
+        vc = member.guild.voice_client
+        if not vc or not vc.channel:
+            return
+        if member.id == self.bot.user.id or vc.channel in (before.channel, after.channel):
+            await self._update_listeners(vc)
+
+    def _has_listeners(self, vc) -> bool:
+        return any(not member.bot for member in vc.channel.members)
+
+    async def _update_listeners(self, vc):
+        """Auto-pause when the bot's channel empties; resume when someone comes back."""
+        player = self.players.get(str(vc.guild.id))
+        if player is None:
+            return
+        if self._has_listeners(vc):
+            if player.auto_paused:
+                await self._auto_resume(player, vc)
+        else:
+            self._auto_pause(player, vc)
+
+    def _auto_pause(self, player: GuildPlayer, vc):
+        """Stop ffmpeg for an empty channel, keeping the track and position to resume from."""
+        if player.current is None or player.auto_paused:
+            return
+        if not (vc.is_playing() or vc.is_paused()):
+            return
+        gid = player.guild_id
+        now = self.bot.loop.time()
+        player.resume_position = player.position(now) or 0.0
+        player.resume_paused = vc.is_paused()
+        player.mark_started(now, player.resume_position, paused=True)
+        player.state = PAUSED
+        prespawn_task, player.prespawn_task = player.prespawn_task, None
+        if prespawn_task:
+            prespawn_task.cancel()
+        self._discard_prespawn(gid)
+        # The stopped source's after-callback must not advance the queue.
+        player.source = None
+        vc.stop()
+        self.logger.info(
+            f"Auto-paused GID {gid} at {player.resume_position:.0f}s: no listeners left."
+        )
+
+    async def _auto_resume(self, player: GuildPlayer, vc):
+        """Restart the auto-paused track where it stopped."""
+        gid = player.guild_id
+        track = player.current
+        position, player.resume_position = player.resume_position, None
+        if track is None:
+            return
+        try:
+            await self._ensure_fresh_url(track, margin=30, gid=gid)
+            source = await self._spawn_source(track, gid, start=position)
+        except Exception as e:
+            self.logger.error(f"Failed to resume auto-paused track for GID {gid}: {e}")
+            self._post_event(player, "advance")
+            return
+        if (
+            self.players.get(gid) is not player
+            or player.current is not track
+            or not vc.is_connected()
+            or vc.is_playing()
+            or vc.is_paused()
+            or not self._has_listeners(vc)
+        ):
+            self.bot.loop.run_in_executor(None, source.cleanup)
+            if self.players.get(gid) is player and player.current is track:
+                player.resume_position = position
+            return
+
+        self._play_source(vc, player, source)
+        player.mark_started(self.bot.loop.time(), position, paused=player.resume_paused)
+        player.state = PAUSED if player.resume_paused else PLAYING
+        if player.resume_paused:
+            vc.pause()
+        player.idle_since = None
+        self._prefetch_upcoming(gid)
+        self._schedule_prespawn(gid, track)
+        self.logger.info(f"Resumed GID {gid} at {position:.0f}s.")
+
+    def _session_snapshot(self, player: GuildPlayer) -> dict | None:
+        """Stored form of a guild's session: unresolved entries, no stream URLs."""
+        guild = self.bot.get_guild(int(player.guild_id))
+        vc = guild.voice_client if guild else None
+        if not vc or not vc.channel:
+            return None
+        current = player.current
+        queue = [track.to_entry() for track in player.queue if track.webpage_url]
+        if (current is None or not current.webpage_url) and not queue:
+            return None
+        if player.auto_paused:
+            position, paused = player.resume_position, player.resume_paused
+        else:
+            position = player.position(self.bot.loop.time()) or 0.0
+            paused = player.paused
+        channel = getattr(player.ctx, "channel", None)
+        return {
+            "guild_id": player.guild_id,
+            "voice_channel_id": str(vc.channel.id),
+            "text_channel_id": str(channel.id) if channel else None,
+            "current": current.to_entry() if current and current.webpage_url else None,
+            "position": position,
+            "paused": paused,
+            "queue": queue,
+        }
+
+    async def _save_sessions(self):
+        sessions = []
+        for player in self.players:
+            try:
+                snapshot = self._session_snapshot(player)
+            except Exception as e:
+                self.logger.warning(f"Failed to snapshot music session for GID {player.guild_id}: {e}")
+                continue
+            if snapshot:
+                sessions.append(snapshot)
+        try:
+            await replace_music_sessions(sessions)
+        except Exception as e:
+            self.logger.error(f"Failed to save music sessions: {e}")
+
+    @tasks.loop(seconds=SESSION_SNAPSHOT_INTERVAL or 60)
+    async def snapshot_sessions(self):
+        """Persist every guild's queue and position for a warm restart."""
+        await self._save_sessions()
+
+    async def _restore_sessions(self):
+        """Rejoin voice and resume the sessions saved before the last shutdown."""
+        await self.bot.wait_until_ready()
+        try:
+            sessions = await get_music_sessions()
+        except Exception as e:
+            self.logger.error(f"Failed to load saved music sessions: {e}")
+            sessions = []
+        restored = 0
+        for session in sessions:
+            try:
+                restored += await self._restore_session(session)
+            except Exception as e:
+                self.logger.warning(
+                    f"Failed to restore music session for GID {session.get('guild_id')}: {e}"
+                )
+        if sessions:
+            self.logger.info(f"Restored {restored}/{len(sessions)} music session(s).")
+        self.sessions_restored = True
+        self.snapshot_sessions.start()
+
+    async def _restore_session(self, session: dict) -> bool:
+        guild = self.bot.get_guild(int(session["guild_id"]))
+        if guild is None:
+            return False
+        channel = guild.get_channel(int(session["voice_channel_id"]))
+        if channel is None:
+            return False
+        gid = str(guild.id)
+        player = self.players.get(gid)
+        if player is not None and (player.current or player.queue):
+            return False  # someone started playing while we were restoring
+        current = Track.from_entry(session["current"]) if session.get("current") else None
+        tracks = [Track.from_entry(entry) for entry in session.get("queue") or ()]
+        if current is None and not tracks:
+            return False
+
+        vc = guild.voice_client
+        if vc is None:
+            vc = await channel.connect()
+        elif vc.channel != channel:
+            await vc.move_to(channel)
+        text_id = session.get("text_channel_id")
+        ctx = PlayerContext(guild, guild.get_channel(int(text_id)) if text_id else None)
+
+        position = float(session.get("position") or 0.0)
+        if current is None:
+            # Only a queue was saved: its head waits like a paused track at 0s.
+            current, tracks, position = tracks[0], tracks[1:], 0.0
+        player = self.players.ensure(gid)
+        player.queue.extend(tracks)
+        player.ctx = ctx
+        # Restored as auto-paused: ffmpeg starts (and the stream URL resolves) only
+        # once a listener is in the channel.
+        player.current = current
+        player.resume_position = position
+        player.resume_paused = bool(session.get("paused"))
+        player.mark_started(self.bot.loop.time(), position, paused=True)
+        player.state = PAUSED
+        if self._has_listeners(vc):
+            await self._auto_resume(player, vc)
+        return True
+
+    @tasks.loop(seconds=IDLE_CHECK_INTERVAL)
+    async def disconnect_idle(self):
+        """Leave voice channels where nobody listened or nothing played for IDLE_TIMEOUT."""
+        now = self.bot.loop.time()
+        for vc in list(self.bot.voice_clients):
+            if not vc.channel:
+                continue
+            gid = str(vc.guild.id)
+            player = self.players.get(gid)
+            if (vc.is_playing() or vc.is_paused()) and self._has_listeners(vc):
+                if player is not None:
+                    player.idle_since = None
+                continue
+            if player is None:
+                # Connected without a player (e.g. after !stop); the idle clock needs
+                # one, and the disconnect below disposes it again.
+                player = self.players.ensure(gid)
+            if player.idle_since is None:
+                player.idle_since = now
+                continue
+            if now - player.idle_since < IDLE_TIMEOUT:
+                continue
+            self.logger.info(f"Leaving idle voice channel in GID {gid}.")
+            self._dispose_player(gid, "idle")
+            try:
+                await vc.disconnect()
+            except Exception as e:
+                self.logger.error(f"Error disconnecting idle voice client for GID {gid}: {e}")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        vc = guild.voice_client
+        self._dispose_player(str(guild.id), "guild removed")
+        if vc:
+            try:
+                await vc.disconnect(force=True)
+            except Exception as e:
+                self.logger.error(f"Error disconnecting from removed guild {guild.id}: {e}")
 
     def _format_duration(self, seconds: float) -> str:
         """Formats seconds into HH:MM:SS or MM:SS string."""
@@ -126,303 +525,889 @@ class MusicCommands(commands.Cog):
         else:
             return f"{minutes:02d}:{seconds:02d}"
 
+    def _current_track(self, gid: str) -> Track | None:
+        player = self.players.get(gid)
+        return player.current if player else None
+
     def _get_current_position(self, gid: str) -> float | None:
         """Estimates the current playback position in seconds."""
-        loop = self.bot.loop
-        start_time = self.playback_start_time.get(gid)
-        seek_pos = self.playback_seek_position.get(gid, 0.0)
-        pause_start = self.pause_start_time.get(gid)
-
-        if start_time is None:
+        player = self.players.get(gid)
+        if player is None:
             return None
+        return player.position(self.bot.loop.time())
+
+    def _hold_track(self, player: GuildPlayer, ctx, track: Track):
+        """Make ``track`` current but auto-paused at 0s, for a channel that emptied
+        while it was loading; ffmpeg starts only once a listener comes back."""
+        self._discard_prespawn(player.guild_id)
+        player.current = track
+        player.ctx = ctx
+        player.resume_position = 0.0
+        player.resume_paused = False
+        player.mark_started(self.bot.loop.time(), 0.0, paused=True)
+        player.state = PAUSED
+        player.ended_at = None
+        self.logger.info(
+            f"Holding {track.title} for GID {player.guild_id}: no listeners left."
+        )
 
-        current_time = loop.time()
-        elapsed_time = current_time - start_time
-
-        if pause_start:
-            time_paused = current_time - pause_start
-            elapsed_time -= time_paused
-
-        elapsed_time = max(0.0, elapsed_time)
-
-        return seek_pos + elapsed_time
-
-    async def _start_track(self, ctx, gid: str, track: dict, announce: bool = True):
+    async def _start_track(self, ctx, gid: str, track: Track, announce: bool = True):
         """Start playback for a prepared track and update state."""
         vc = ctx.guild.voice_client
         if not vc or not vc.is_connected():
             raise RuntimeError("Voice client unavailable for playback.")
 
-        if not track or "url" not in track:
-            raise ValueError("Track is missing stream URL.")
+        if not track:
+            raise ValueError("No track to play.")
 
-        volume = self.volumes.get(gid, 1.0)
-        source = discord.PCMVolumeTransformer(
-            discord.FFmpegPCMAudio(track["url"], **FFMPEG_OPTIONS),
-            volume=volume,
-        )
+        player = self.players.ensure(gid)
+        if not self._has_listeners(vc):
+            self._hold_track(player, ctx, track)
+            return
+        source = self._take_prespawned(gid, track) or await self._spawn_source(track, gid)
+        if not self._has_listeners(vc):
+            self.bot.loop.run_in_executor(None, source.cleanup)
+            self._hold_track(player, ctx, track)
+            return
 
-        def _after(error_arg):
-            self.handle_after_play(error_arg, ctx, gid)
+        self._play_source(vc, player, source)
+        if player.ended_at is not None:
+            self._record_transition(time.monotonic() - player.ended_at)
+            player.ended_at = None
 
-        vc.play(source, after=_after)
+        player.mark_started(self.bot.loop.time())
+        player.current = track
+        player.state = PLAYING
+        player.ctx = ctx
+        player.resume_position = None
+        player.idle_since = None
 
-        loop = self.bot.loop
-        self.playback_start_time[gid] = loop.time()
-        self.playback_seek_position[gid] = 0.0
-        self.pause_start_time.pop(gid, None)
-        self.current_tracks[gid] = track
+        self._prefetch_upcoming(gid)
+        self._schedule_prespawn(gid, track)
 
         if announce and ctx and ctx.channel:
-            await ctx.send(f"Now playing: **{track.get('title', 'Unknown')}**")
+            await ctx.send(f"Now playing: **{track.title}**")
+
+    def _create_source(
+        self, track: Track, gid: str, start: float = 0.0, kind: str = "play"
+    ) -> discord.AudioSource:
+        """Audio source for a track at the guild's volume, starting `start` seconds in."""
+        volume = self.settings.get(gid, "volume")
+        if PLAYBACK_MODE == "pcm":
+            return discord.PCMVolumeTransformer(
+                self._buffered(
+                    self._create_ffmpeg_source(track, gid, start, opus=False, kind=kind)
+                ),
+                volume=volume,
+            )
+        return self._buffered(
+            self._create_ffmpeg_source(
+                track, gid, start, opus=True, volume=volume, kind=kind
+            )
+        )
 
-    async def _fetch_track_info(self, url_or_id):
-        """Fetches full track info for a single URL or ID. Runs in executor."""
-        loop = self.bot.loop
+    def _buffered(self, source: FFmpegTrackSource) -> RingBufferedSource:
+        return RingBufferedSource(
+            source, READAHEAD_SECONDS, on_close=self._record_readahead_stats
+        )
 
-        # Simplified format selection - try these in order
-        formats_to_try = [
-            "bestaudio[ext=webm]/bestaudio[ext=m4a]/bestaudio",
-            "best[height<=720]/best",
-            "worst",  # Last resort
-        ]
+    def _record_readahead_stats(self, source: RingBufferedSource):
+        # Called on the audio thread when a track's source is cleaned up.
+        totals = self.readahead_totals
+        totals["tracks"] += 1
+        totals["underruns"] += source.underruns
+        totals["stall_seconds"] += source.stall_seconds
+
+    def _can_pass_through(self, track: Track, volume: float, from_cache: bool) -> bool:
+        if abs(volume - 1.0) >= 1e-3:
+            return False
+        if from_cache:
+            return True
+        abr = track.abr or 0
+        return (track.acodec or "").startswith("opus") and abr <= OPUS_PASSTHROUGH_MAX_KBPS
+
+    def _create_ffmpeg_source(
+        self,
+        track: Track,
+        gid: str,
+        start: float = 0.0,
+        opus: bool = True,
+        volume: float = 1.0,
+        kind: str = "play",
+    ) -> FFmpegTrackSource:
+        """FFmpeg process for a track: the disk-cached copy if present, else the stream URL."""
+        cache_key = self._metadata_key(track)
+        options = {
+            "start": start,
+            "opus": opus,
+            "volume": volume,
+        }
+        cached_path = self.opus_cache.path_for(cache_key)
+        tee_path = None
+        if cached_path:
+            input_path = cached_path
+            options["remote"] = False
+            options["copy_opus"] = opus and self._can_pass_through(track, volume, True)
+        else:
+            if not track.url:
+                raise ValueError("Track is missing stream URL.")
+            input_path = track.url
+            options["copy_opus"] = opus and self._can_pass_through(track, volume, False)
+            duration = track.duration or 0
+            if start <= 0 and 0 < duration <= OPUS_CACHE_MAX_TRACK_SECONDS:
+                tee_path = self.opus_cache.reserve(cache_key)
+            if tee_path:
+                options["tee_path"] = tee_path
+                options["tee_copy"] = (track.acodec or "").startswith("opus")
+
+        def _on_exit(process):
+            # Runs on the audio thread once the source is cleaned up.
+            self.ffmpeg_supervisor.untrack(process)
+            if tee_path:
+                # Only a cleanly finished ffmpeg wrote a whole file.
+                if process.returncode == 0:
+                    self.opus_cache.commit(cache_key, tee_path)
+                else:
+                    self.opus_cache.discard(cache_key, tee_path)
+
+        try:
+            source = FFmpegTrackSource(input_path, on_exit=_on_exit, **options)
+        except Exception:
+            if tee_path:
+                self.opus_cache.discard(cache_key, tee_path)
+            raise
+        self.ffmpeg_supervisor.track(source.process, gid, kind)
+        return source
+
+    async def _spawn_source(
+        self, track: Track, gid: str, start: float = 0.0, kind: str = "play", wait: bool = True
+    ) -> discord.AudioSource | None:
+        """Create a track's source under the global ffmpeg cap; None if no slot (wait=False)."""
+        try:
+            acquired = await self.ffmpeg_supervisor.acquire(
+                wait=wait, timeout=FFMPEG_SLOT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            raise Exception("The bot is at its audio stream limit; try again shortly.")
+        if not acquired:
+            return None
+        try:
+            return self._create_source(track, gid, start, kind)
+        except Exception:
+            self.ffmpeg_supervisor.release()
+            raise
+
+    def _ffmpeg_process_of(self, source):
+        """The ffmpeg process behind a (possibly wrapped) track source."""
+        while source is not None and not isinstance(source, FFmpegTrackSource):
+            source = getattr(source, "original", None) or getattr(source, "source", None)
+        return source.process if source is not None else None
+
+    @tasks.loop(seconds=FFMPEG_SWEEP_INTERVAL)
+    async def supervise_ffmpeg(self):
+        """Sample ffmpeg usage and clean up processes no player owns any more."""
+        active = set()
+        starving = set()
+        sources = [vc.source for vc in self.bot.voice_clients if vc.source]
+        sources.extend(player.prespawned[1] for player in self.players if player.prespawned)
+        for source in sources:
+            process = self._ffmpeg_process_of(source)
+            if process:
+                active.add(process.pid)
+                buffered = getattr(source, "original", source)
+                if isinstance(buffered, RingBufferedSource) and buffered.starving:
+                    starving.add(process.pid)
+        try:
+            await self.bot.loop.run_in_executor(
+                None, self.ffmpeg_supervisor.sweep, active, starving
+            )
+        except Exception as e:
+            self.logger.error(f"ffmpeg supervisor sweep failed: {e}")
+
+    def _schedule_prespawn(self, gid: str, track: Track):
+        player = self.players.ensure(gid)
+        existing, player.prespawn_task = player.prespawn_task, None
+        if existing and not existing.done():
+            existing.cancel()
+        if PRESPAWN_SECONDS <= 0 or not track.duration:
+            return
+        player.prespawn_task = self.bot.loop.create_task(
+            self._prespawn_next(player, track)
+        )
+
+    async def _prespawn_next(self, player: GuildPlayer, track: Track):
+        """Spawn and prime the next track's source shortly before `track` ends."""
+        gid = player.guild_id
+        queue = player.queue
+        try:
+            while player.current is track:
+                position = player.position(self.bot.loop.time())
+                if position is None:
+                    return
+                if player.paused:
+                    await asyncio.sleep(5)
+                    continue
+                remaining = track.duration - position
+                if remaining > PRESPAWN_SECONDS:
+                    # Re-check periodically; seeks and pauses move the end time.
+                    await asyncio.sleep(min(remaining - PRESPAWN_SECONDS, 30))
+                    continue
+                break
+            else:
+                return
+
+            upcoming = queue.peek()
+            if upcoming is None:
+                return
+            held = player.prespawned
+            if held and held[0] is upcoming:
+                return
+            await self._ensure_fresh_url(upcoming, margin=PRESPAWN_SECONDS + 60, gid=gid)
+            if player.current is not track or queue.peek() is not upcoming:
+                return
+            # Never queue for a slot just to pre-spawn; the hand-off falls back to a normal start.
+            source = await self._spawn_source(upcoming, gid, kind="prespawn", wait=False)
+            if source is None:
+                return
+            if (
+                self.players.get(gid) is not player
+                or player.current is not track
+                or queue.peek() is not upcoming
+            ):
+                self.bot.loop.run_in_executor(None, source.cleanup)
+                return
+            self._discard_prespawn(gid)
+            player.prespawned = (upcoming, source)
+            self.prespawn_stats["spawned"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Could not pre-spawn next track for GID {gid}: {e}")
+        finally:
+            if player.prespawn_task is asyncio.current_task():
+                player.prespawn_task = None
+
+    def _take_prespawned(self, gid: str, track: Track) -> discord.AudioSource | None:
+        """The primed source for `track` if one was pre-spawned and is still usable."""
+        player = self.players.get(gid)
+        held = player.prespawned if player else None
+        if not held:
+            return None
+        if held[0] is not track:
+            self._discard_prespawn(gid)
+            return None
+        player.prespawned = None
+        source = held[1]
+        buffered = getattr(source, "original", source)
+        if isinstance(buffered, RingBufferedSource) and buffered.exhausted:
+            # ffmpeg died while waiting (e.g. the URL expired); spawn a fresh one.
+            self.prespawn_stats["discarded"] += 1
+            self.bot.loop.run_in_executor(None, source.cleanup)
+            return None
+        self.prespawn_stats["used"] += 1
+        self.ffmpeg_supervisor.set_kind(self._ffmpeg_process_of(source), "play")
+        return source
+
+    def _discard_prespawn(self, gid: str):
+        """Drop a pre-spawned source; its ffmpeg is killed off the event loop."""
+        player = self.players.get(gid)
+        if player is None or player.prespawned is None:
+            return
+        held, player.prespawned = player.prespawned, None
+        self.prespawn_stats["discarded"] += 1
+        self.bot.loop.run_in_executor(None, held[1].cleanup)
+
+    def _check_prespawn(self, gid: str):
+        """Discard the pre-spawned source if the queue head is no longer its track."""
+        player = self.players.get(gid)
+        if player and player.prespawned and player.queue.peek() is not player.prespawned[0]:
+            self._discard_prespawn(gid)
+
+    async def _restart_current(self, ctx, gid: str, position: float) -> bool:
+        """Respawn the current track's ffmpeg at `position`, keeping the pause state."""
+        vc = ctx.guild.voice_client
+        player = self.players.get(gid)
+        track = player.current if player else None
+        if not vc or not vc.is_connected() or not track:
+            return False
+        if not (vc.is_playing() or vc.is_paused()):
+            return False
+        was_paused = vc.is_paused()
 
-        for format_option in formats_to_try:
+        source = await self._spawn_source(track, gid, start=position, wait=False)
+        if source is None:
+            # At the ffmpeg cap: free this guild's slot first, then queue for one.
+            player.source = None
+            vc.stop()
             try:
-                ydl_opts = YDL_OPTIONS.copy()
-                ydl_opts["format"] = format_option
-                ydl_opts["noplaylist"] = True
-                # Force full extraction so we can resolve stream URLs from searches/playlists
-                ydl_opts["extract_flat"] = False
+                source = await self._spawn_source(track, gid, start=position)
+            except Exception:
+                self._post_event(player, "advance")
+                raise
+        if (
+            self.players.get(gid) is not player
+            or player.current is not track
+            or not vc.is_connected()
+        ):
+            self.bot.loop.run_in_executor(None, source.cleanup)
+            return False
 
-                # Add timeout to prevent hanging
-                ydl_opts["socket_timeout"] = 30
+        if vc.is_playing() or vc.is_paused():
+            # The replaced source's after-callback must not advance the queue.
+            player.source = None
+            vc.stop()
+        self._play_source(vc, player, source)
 
-                ydl = youtube_dl.YoutubeDL(ydl_opts)
+        player.mark_started(self.bot.loop.time(), position, paused=was_paused)
+        if was_paused:
+            vc.pause()
+        return True
 
-                # Add timeout to the executor call
-                try:
-                    data = await asyncio.wait_for(
-                        loop.run_in_executor(
-                            None,
-                            functools.partial(
-                                ydl.extract_info, url_or_id, download=False
-                            ),
-                        ),
-                        timeout=45.0,  # 45 second timeout
-                    )
-                except asyncio.TimeoutError:
-                    self.logger.warning(f"Timeout fetching track info for {url_or_id}")
-                    continue
+    async def _track_from_disk_cache(self, target: str) -> Track | None:
+        """Queue entry for a disk-cached track, built without any extraction."""
+        cache_key = cache_key_for_target(target)
+        if not self.opus_cache.contains(cache_key):
+            return None
+        try:
+            stored = (await get_track_metadata([cache_key])).get(cache_key)
+        except Exception as e:
+            self.logger.warning(f"Failed to read track metadata for {cache_key}: {e}")
+            return None
+        if not stored or not stored.get("title"):
+            return None
+        return Track(
+            title=stored["title"],
+            duration=stored.get("duration"),
+            webpage_url=stored.get("webpage_url") or target,
+            uploader=stored.get("uploader"),
+            thumbnail=stored.get("thumbnail"),
+        )
 
-                if not data:
-                    continue
+    async def _fetch_track_info(
+        self, url_or_id, use_cache: bool = True, lane: str = HIGH, gid: str | None = None
+    ):
+        """Fetches full track info for a single URL or ID, served from cache when fresh."""
+        cache_key = cache_key_for_target(url_or_id)
+        known_bad = self.negative_cache.get(cache_key)
+        # A forced refetch is a retry; a recent timeout should not short-circuit it.
+        if known_bad and (use_cache or known_bad[0] != TIMEOUT):
+            failure, message = known_bad
+            raise TrackFailedError(failure, message)
+        if use_cache:
+            cached, needs_refresh = self.track_cache.get(cache_key)
+            if cached:
+                if needs_refresh:
+                    self._schedule_track_refresh(cache_key, url_or_id, gid)
+                return cached
+
+        return await self._extract_coalesced(url_or_id, cache_key, lane=lane, gid=gid)
+
+    async def _extract_coalesced(
+        self, url_or_id, cache_key, lane: str = HIGH, gid: str | None = None
+    ):
+        """Join an in-flight extraction of the same target, or start one others can join."""
+        key = inflight_key_for_target(url_or_id)
+        if key is None:
+            return await self._extract_and_remember(url_or_id, cache_key, lane, gid)
+
+        task = self.inflight_extractions.get(key)
+        if task is None:
+            jobs = []
+            task = self.bot.loop.create_task(
+                self._extract_and_remember(url_or_id, cache_key, lane, gid, jobs=jobs)
+            )
+            self.inflight_extractions[key] = task
+            self.inflight_jobs[key] = jobs
+            self.inflight_stats["started"] += 1
+
+            def _done(finished, key=key):
+                if self.inflight_extractions.get(key) is finished:
+                    del self.inflight_extractions[key]
+                    self.inflight_jobs.pop(key, None)
+                if not finished.cancelled():
+                    finished.exception()  # retrieved even if every waiter left
+
+            task.add_done_callback(_done)
+        else:
+            self.inflight_stats["coalesced"] += 1
+            if lane == HIGH:
+                # Don't leave an interactive request queued behind background work.
+                for job in self.inflight_jobs.get(key, ()):
+                    if self.extraction.promote(job):
+                        self.inflight_stats["promoted"] += 1
+
+        # Shielded so one requester cancelling does not cancel the shared extraction.
+        data = await asyncio.shield(task)
+        return dict(data)
+
+    async def _extract_and_remember(
+        self, url_or_id, cache_key, lane: str = HIGH, gid: str | None = None, jobs=None
+    ):
+        try:
+            data = await self._extract_track_info(url_or_id, lane=lane, gid=gid, jobs=jobs)
+        except Exception as e:
+            failure = classify_extraction_error(e)
+            if failure is None:
+                raise
+            self.negative_cache.put(cache_key, failure, str(e))
+            if isinstance(e, TrackFailedError):
+                raise
+            raise TrackFailedError(failure, str(e)) from e
+        self.track_cache.put(data, cache_key)
+        metadata = track_metadata(data)
+        if metadata:
+            query_key = inflight_key_for_target(url_or_id)
+            self._persist_track_metadata(
+                [metadata],
+                query_key=query_key if query_key and query_key.startswith("search:") else None,
+            )
+        return data
 
-                # If we got a search/playlist result, dig into the first entry and resolve it
-                if data.get("entries"):
-                    first_entry = next((entry for entry in data["entries"] if entry), None)
-                    if not first_entry:
-                        continue
-                    entry_target = (
-                        first_entry.get("webpage_url")
-                        or first_entry.get("url")
-                        or first_entry.get("id")
-                    )
-                    if entry_target:
-                        return await self._fetch_track_info(entry_target)
-                    continue
+    def _persist_track_metadata(
+        self, tracks: list, overwrite: bool = True, query_key: str | None = None
+    ):
+        """Write track metadata to the store in the background."""
+        if not tracks:
+            return
 
-                stream_url = data.get("url")
-                if stream_url and not stream_url.startswith("file://"):
-                    return data
+        async def _write():
+            try:
+                await upsert_track_metadata(tracks, overwrite, query_key)
+            except Exception as e:
+                self.logger.warning(f"Failed to persist track metadata: {e}")
+
+        task = self.bot.loop.create_task(_write())
+        self.metadata_tasks.add(task)
+        task.add_done_callback(self.metadata_tasks.discard)
+
+    def _metadata_key(self, track: Track) -> str | None:
+        return cache_key_for_target(track.webpage_url)
+
+    async def _apply_stored_metadata(self, tracks: list):
+        """Fill missing titles/durations from the metadata store, in place."""
+        missing = {}
+        for track in tracks:
+            if not track.has_title or not track.duration:
+                key = self._metadata_key(track)
+                if key:
+                    missing.setdefault(key, []).append(track)
+        if not missing:
+            return
+        try:
+            stored = await get_track_metadata(list(missing))
+        except Exception as e:
+            self.logger.warning(f"Failed to read track metadata: {e}")
+            return
+        for key, doc in stored.items():
+            for track in missing.get(key, []):
+                if not track.has_title and doc.get("title"):
+                    track.title = doc["title"]
+                if not track.duration and doc.get("duration"):
+                    track.duration = doc["duration"]
+
+    async def _tracks_from_entries(self, entries: list) -> list:
+        """Unresolved queue entries for flat playlist entries, backed by the metadata store."""
+        tracks = [
+            track
+            for track in map(Track.from_entry, entries)
+            # Entries that failed recently are dropped without another extraction.
+            if self.negative_cache.get(self._metadata_key(track)) is None
+        ]
+        await self._apply_stored_metadata(tracks)
+        self._persist_track_metadata(
+            [
+                {"track_id": key, "title": track.title, "duration": track.duration}
+                for track in tracks
+                if (key := self._metadata_key(track)) and track.has_title and track.duration
+            ],
+            overwrite=False,
+        )
+        return tracks
 
+    def _schedule_track_refresh(self, cache_key: str, target: str, gid: str | None = None):
+        """Re-extract a cached track in the background before its stream URL expires."""
+        existing = self.refresh_tasks.get(cache_key)
+        if existing and not existing.done():
+            return
+
+        async def _refresh():
+            try:
+                await self._fetch_track_info(target, use_cache=False, lane=LOW, gid=gid)
             except Exception as e:
-                self.logger.warning(
-                    f"Failed to fetch track with format {format_option}: {str(e)}"
-                )
-                continue
+                self.logger.warning(f"Background refresh failed for {target}: {e}")
+            finally:
+                self.refresh_tasks.pop(cache_key, None)
 
-        raise Exception("Could not extract audio information with any available format")
+        self.refresh_tasks[cache_key] = self.bot.loop.create_task(_refresh())
 
-    def _canonical_playlist_url(self, url: str) -> str:
-        """Normalize a YouTube playlist URL so yt-dlp reliably expands it."""
-        match = re.search(r"[?&]list=([A-Za-z0-9_-]+)", url)
-        if match:
-            list_id = match.group(1)
-            return f"https://www.youtube.com/playlist?list={list_id}"
-        return url
+    def _stream_url_expires_in(self, url) -> float | None:
+        """Seconds until a stream URL expires, or None when it carries no expiry."""
+        expiry = stream_url_expiry(url)
+        if expiry is None:
+            return None
+        return expiry - time.time()
 
-    async def _fetch_playlist_tracks(self, playlist_url: str, limit: int = 250):
-        """Fetch playlist entries (metadata only). Actual streams resolved lazily."""
-        loop = self.bot.loop
-        ydl_opts = YDL_OPTIONS.copy()
-        ydl_opts["noplaylist"] = False
-        ydl_opts["extract_flat"] = True  # enumerate entries quickly
-        ydl_opts["socket_timeout"] = 30
+    def _needs_resolution(self, track: Track, margin: float = 0.0) -> bool:
+        """True if a queued track has no stream URL or it expires within `margin` seconds."""
+        if self.opus_cache.contains(self._metadata_key(track)):
+            return False
+        if not track.url:
+            return True
+        expires_in = self._stream_url_expires_in(track.url)
+        return expires_in is not None and expires_in <= margin
+
+    async def _ensure_fresh_url(
+        self, track: Track, margin: float = 0.0, lane: str = HIGH, gid: str | None = None
+    ):
+        """Resolve a track's stream URL if it is missing or expires within `margin` seconds."""
+        if self.opus_cache.contains(self._metadata_key(track)):
+            return
+        expires_in = self._stream_url_expires_in(track.url)
+        if track.url and (expires_in is None or expires_in > margin):
+            return
+        target = track.webpage_url or track.url
+        if not target:
+            return
+        fresh = await self._fetch_track_info(target, lane=lane, gid=gid)
+        fresh_expires_in = self._stream_url_expires_in(fresh.get("url"))
+        if fresh_expires_in is not None and fresh_expires_in <= margin:
+            fresh = await self._fetch_track_info(
+                target, use_cache=False, lane=lane, gid=gid
+            )
+        if fresh.get("url"):
+            track.update_from_info(fresh)
+
+    def _prefetch_upcoming(self, gid: str):
+        """Resolve stream URLs for the next PREFETCH_WINDOW queued tracks in the background."""
+        player = self.players.get(gid)
+        if player is None:
+            return
+        existing = player.loading_task
+        if existing and not existing.done():
+            # The running prefetcher re-scans the window after each batch.
+            return
+        if not any(
+            self._needs_resolution(track, TRACK_REFRESH_MARGIN)
+            for track in player.queue.head(PREFETCH_WINDOW)
+        ):
+            return
+        player.loading_task = self.bot.loop.create_task(self._prefetch_window(player))
 
-        ydl = youtube_dl.YoutubeDL(ydl_opts)
+    async def _prefetch_window(self, player: GuildPlayer):
+        """Keep the head of the queue resolved until the window holds no stale entries."""
+        gid = player.guild_id
+        semaphore = asyncio.Semaphore(PLAYLIST_CONCURRENCY)
+        attempted = set()
+
+        async def _resolve(track):
+            async with semaphore:
+                try:
+                    await self._ensure_fresh_url(
+                        track, margin=TRACK_REFRESH_MARGIN, lane=LOW, gid=gid
+                    )
+                except Exception as e:
+                    self.logger.warning(
+                        f"Failed to prefetch {track.webpage_url or track.title}: {e}"
+                    )
 
         try:
-            info = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None, functools.partial(ydl.extract_info, playlist_url, download=False)
-                ),
-                timeout=60.0,
+            while True:
+                async with player.loading_lock:
+                    candidates = [
+                        track
+                        for track in player.queue.head(PREFETCH_WINDOW)
+                        if id(track) not in attempted
+                        and self._needs_resolution(track, TRACK_REFRESH_MARGIN)
+                    ]
+                if not candidates:
+                    break
+                attempted.update(id(track) for track in candidates)
+                await asyncio.gather(*(_resolve(track) for track in candidates))
+        finally:
+            # cleanup task record unless a newer prefetcher replaced it
+            if player.loading_task is asyncio.current_task():
+                player.loading_task = None
+
+    async def _extract_track_info(
+        self, url_or_id, lane: str = HIGH, gid: str | None = None, jobs: list | None = None
+    ):
+        """Runs one yt-dlp extraction for a URL, ID or search under a single deadline.
+
+        Executor jobs are appended to ``jobs`` as they are queued, when given.
+        """
+        jobs = [] if jobs is None else jobs
+
+        def attempt(profile: str = "track"):
+            job = self.extraction.enqueue(
+                ytdl_jobs.extract_track, url_or_id, profile, lane=lane, guild_id=gid
             )
+            jobs.append(job)
+            return job.future
+
+        # Only a user is waiting on the high lane; prefetches are not worth doubling.
+        if HEDGE_EXTRACTION and lane == HIGH:
+            extraction = self.hedge_policy.run(
+                attempt,
+                lambda: attempt("track_hedge"),
+                valid=lambda data: data and data.get("url"),
+            )
+        else:
+            extraction = attempt()
+        try:
+            data = await asyncio.wait_for(extraction, timeout=TRACK_EXTRACT_DEADLINE)
         except asyncio.TimeoutError:
-            self.logger.warning(f"Timeout fetching playlist info for {playlist_url}")
-            return []
-        except Exception as e:
-            self.logger.warning(f"Failed to fetch playlist {playlist_url}: {e}")
-            return []
-
-        entries = [entry for entry in info.get("entries", []) if entry]
-        if not entries:
-            return []
-
-        playlist_entries = []
-        for entry in entries[:limit]:
-            entry_target = (
-                entry.get("webpage_url") or entry.get("url") or entry.get("id")
+            self.logger.warning(f"Timeout fetching track info for {url_or_id}")
+            if not any(job.dispatched for job in jobs):
+                # Never reached a worker: the executor is congested, not the track slow.
+                raise asyncio.TimeoutError(
+                    f"Timed out after {TRACK_EXTRACT_DEADLINE:.0f}s waiting for an extraction worker"
+                )
+            raise TrackFailedError(
+                TIMEOUT,
+                f"Timed out after {TRACK_EXTRACT_DEADLINE:.0f}s resolving audio information",
             )
-            if not entry_target:
-                continue
-            playlist_entries.append(
-                {
-                    "target": entry_target,
-                    "title": entry.get("title") or "Unknown Title",
-                    "duration": entry.get("duration"),
-                }
+
+        if not data:
+            # Nothing came back (e.g. an empty search); not a property of the track.
+            raise ValueError("Could not extract audio information")
+        if not data.get("url"):
+            raise TrackFailedError(
+                FORMAT, "Could not extract audio information with any available format"
             )
+        return data
 
-        return playlist_entries
+    def _canonical_playlist_url(self, url: str) -> str:
+        """Normalize a YouTube playlist URL so yt-dlp reliably expands it."""
+        match = re.search(r"[?&]list=([A-Za-z0-9_-]+)", url)
+        if match:
+            list_id = match.group(1)
+            return f"https://www.youtube.com/playlist?list={list_id}"
+        return url
 
-    async def _background_load_playlist(self, ctx, gid: str):
-        """Resolve playlist entries into playable tracks without blocking the main command."""
-        loading_queue = self.loading_queues.get(gid, [])
-        play_next_event = self.play_next_events.get(gid)
+    def _open_playlist_stream(self, playlist_url: str, gid: str) -> PlaylistStream:
+        """Start enumerating a playlist; pages of entries arrive as yt-dlp fetches them."""
+        return PlaylistStream(
+            self.extraction,
+            playlist_url,
+            limit=PLAYLIST_MAX_ENTRIES,
+            guild_id=gid,
+            manager=self.mp_manager,
+        )
 
-        while loading_queue:
-            entry = loading_queue.pop(0)
-            entry_target = entry.get("target")
-            if not entry_target:
-                continue
-            try:
-                full = await self._fetch_track_info(entry_target)
-            except Exception as e:
+    async def _consume_playlist_stream(
+        self, gid: str, stream: PlaylistStream, after: asyncio.Task | None = None
+    ):
+        """Append the remaining pages of a playlist to the queue as they arrive."""
+        player = self.players.ensure(gid)
+        try:
+            if after:
+                # Keep playlists in request order when one is still loading.
+                try:
+                    await after
+                except Exception:
+                    pass
+            player.playlist_stream = stream
+            while True:
+                try:
+                    page = await stream.next_page()
+                except Exception:
+                    break  # reported through stream.error below
+                if page is None:
+                    break
+                tracks = await self._tracks_from_entries(page)
+                async with player.loading_lock:
+                    player.queue.extend(tracks)
+                self._post_event(player, "tracks")
+                self._prefetch_upcoming(gid)
+            if stream.error:
                 self.logger.warning(
-                    f"Failed to resolve playlist entry {entry_target}: {e}"
+                    f"Playlist enumeration for {stream.url} stopped early: {stream.error}"
                 )
-                continue
+        finally:
+            stream.close()
+            # cleanup task record unless a newer loader replaced it
+            if player.playlist_task is asyncio.current_task():
+                player.playlist_task = None
+                player.playlist_stream = None
+
+    def _start_playlist_consumer(self, gid: str, stream: PlaylistStream):
+        if stream.done:
+            stream.close()
+            return
+        self.players.ensure(gid).playlist_task = self.bot.loop.create_task(
+            self._consume_playlist_stream(gid, stream)
+        )
 
-            if not full or "url" not in full:
-                continue
+    def _cancel_playlist_loading(self, gid: str):
+        """Stop enumerating playlists for a guild."""
+        player = self.players.get(gid)
+        if player is None:
+            return
+        task, player.playlist_task = player.playlist_task, None
+        if task and not task.done():
+            task.cancel()
+        stream, player.playlist_stream = player.playlist_stream, None
+        if stream:
+            stream.close()
 
-            track = {
-                "title": full.get("title") or entry.get("title") or "Unknown Title",
-                "url": full.get("url"),
-                "duration": full.get("duration") or entry.get("duration"),
-                "webpage_url": full.get("webpage_url") or entry_target,
-            }
-            queue = self.get_guild_queue(gid)
-            queue.append(track)
-            if play_next_event:
-                play_next_event.set()
+    def _play_source(self, vc, player: GuildPlayer, source):
+        """Start ``source`` as the player's current source."""
+        player.source = source
 
-        # cleanup task record
-        self.loading_tasks.pop(gid, None)
+        def _after(error_arg):
+            self.handle_after_play(error_arg, player, source)
 
-    async def play_next(self, ctx, gid):
-        """Plays the next track in the queue or waits for the background loader."""
-        queue = self.get_guild_queue(gid)
-        play_next_event = self.play_next_events.get(gid)
+        vc.play(source, after=_after)
 
-        if queue:
-            volume = self.volumes.get(gid, 1.0)
-            next_track = queue.pop(0)
+    def handle_after_play(self, error, player: GuildPlayer, source=None):
+        """After-callback for a track's source; runs on the audio thread."""
+        self._post_event(player, "ended", error, time.monotonic(), source)
 
-            vc = ctx.guild.voice_client
-            if not vc or not vc.is_connected():
-                self.logger.warning(
-                    f"play_next called for GID {gid} but voice client is disconnected."
-                )
-                self.current_tracks[gid] = None
-                return
+    def _post_event(self, player: GuildPlayer, kind: str, *args):
+        """Hand an event to the guild's player loop; safe to call from any thread."""
+        try:
+            self.bot.loop.call_soon_threadsafe(self._enqueue_event, player, (kind, *args))
+        except RuntimeError:
+            pass  # event loop already closed during shutdown
 
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # Use existing stream URL first; refresh only if missing or a previous attempt failed.
-                    if attempt > 0 or not next_track.get("url"):
-                        fresh_target = next_track.get("webpage_url") or next_track.get("url")
-                        if fresh_target:
-                            fresh_track = await self._fetch_track_info(fresh_target)
-                            if fresh_track and "url" in fresh_track:
-                                next_track["url"] = fresh_track["url"]
-                    await self._start_track(ctx, gid, next_track, announce=True)
-                    break  # Success, exit retry loop
+    def _enqueue_event(self, player: GuildPlayer, event: tuple):
+        if self.players.get(player.guild_id) is not player:
+            # Disposed (stop, disconnect, idle) while its source was still playing.
+            return
+        if player.loop_task is None or player.loop_task.done():
+            player.loop_task = self.bot.loop.create_task(self._player_loop(player))
+        player.events.put_nowait(event)
+
+    async def _player_loop(self, player: GuildPlayer):
+        """Long-lived consumer of one guild's playback events; advances the queue."""
+        gid = player.guild_id
+        while True:
+            kind, *args = await player.events.get()
+            try:
+                if kind == "ended":
+                    error, ended_at, source = args
+                    if source is not player.source:
+                        # Replaced on purpose (seek, volume, auto-pause); its callback can
+                        # arrive long after the replacement started.
+                        self.logger.debug(f"Ignored end of a replaced source for GID {gid}.")
+                        continue
+                    player.source = None
+                    if error:
+                        self.logger.error(f"Error after playing track for GID {gid}: {error}")
+                    player.ended_at = ended_at
+                    await self._play_next(player)
+                elif kind == "advance":
+                    await self._play_next(player)
+                elif kind == "tracks":
+                    # A playlist page arrived; only matters if playback ran dry waiting for it.
+                    if player.state == IDLE and player.current is None and player.ctx:
+                        vc = player.ctx.guild.voice_client
+                        if vc and vc.is_connected() and not (vc.is_playing() or vc.is_paused()):
+                            await self._play_next(player)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Player loop error for GID {gid} ({kind}): {e}")
+
+    def _record_transition(self, gap: float):
+        self.transition_gaps.append(gap)
+        stats = self.transition_stats
+        stats["count"] += 1
+        stats["total"] += gap
+        stats["max"] = max(stats["max"], gap)
+
+    async def _play_next(self, player: GuildPlayer):
+        """Play the next playable queued track, resolving it first if the prefetcher hasn't."""
+        gid = player.guild_id
+        ctx = player.ctx
+        queue = player.queue
+
+        vc = ctx.guild.voice_client if ctx else None
+        if vc and (vc.is_playing() or vc.is_paused()):
+            # Playback was already taken over (e.g. !play started a track meanwhile).
+            return
 
-                except Exception as e:
-                    self.logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
-                    if attempt == max_retries - 1:  # Last attempt
-                        if ctx and ctx.channel:
-                            await ctx.send(
-                                f"❌ Failed to play: **{next_track.get('title', 'Unknown')}** - Skipping..."
-                            )
-                        self.logger.error(
-                            f"Error in play_next starting track {next_track.get('title', 'N/A')}: {e}"
-                        )
-                        # Try next track
-                        self.bot.loop.create_task(self.play_next(ctx, gid))
-                    else:
-                        await asyncio.sleep(1)  # Wait before retry
+        started = False
+        try:
+            while queue:
+                next_track = queue.popleft()
 
-        else:
-            loader_task = self.loading_tasks.get(gid)
-            if loader_task and not loader_task.done():
-                self.logger.info(
-                    f"play_next for GID {gid}: Queue empty, waiting for background loader..."
-                )
-                while True:
+                vc = ctx.guild.voice_client if ctx else None
+                if not vc or not vc.is_connected():
+                    self.logger.warning(
+                        f"Cannot advance GID {gid}: voice client is disconnected."
+                    )
+                    break
+
+                player.state = LOADING
+                failure = None
+                max_retries = 3
+                for attempt in range(max_retries):
                     try:
-                        await asyncio.wait_for(play_next_event.wait(), timeout=30.0)
-                        play_next_event.clear()
-                        self.logger.info(
-                            f"play_next for GID {gid}: Loader added track, retrying..."
-                        )
-                        self.bot.loop.create_task(self.play_next(ctx, gid))
-                        return
-                    except asyncio.TimeoutError:
-                        if loader_task.done():
-                            break
-                        # keep waiting while loader runs
-                        continue
-                    except Exception as e:
-                        self.logger.error(
-                            f"Error waiting for play_next_event for GID {gid}: {e}"
-                        )
-                        self.current_tracks[gid] = None
+                        # Use existing stream URL first; refresh if missing/expired or a previous attempt failed.
+                        if attempt > 0:
+                            fresh_target = next_track.webpage_url or next_track.url
+                            if fresh_target:
+                                fresh_track = await self._fetch_track_info(
+                                    fresh_target, use_cache=False, gid=gid
+                                )
+                                if fresh_track and "url" in fresh_track:
+                                    # Codec fields too: they decide Opus passthrough.
+                                    next_track.update_from_info(fresh_track)
+                        else:
+                            await self._ensure_fresh_url(next_track, gid=gid)
+                        await self._start_track(ctx, gid, next_track, announce=True)
+                        started = True
                         return
-                # Loader finished but nothing queued
-                self.logger.info(
-                    f"play_next for GID {gid}: Loader finished with no tracks. Playback finished."
-                )
-                self.current_tracks[gid] = None
-            else:
-                self.logger.info(
-                    f"play_next for GID {gid}: Queue empty and no active loader. Playback finished."
-                )
-                self.current_tracks[gid] = None
 
-    def handle_after_play(self, error, ctx, gid):
-        """Callback function for after a track finishes playing or errors."""
-        if self.is_seeking.pop(gid, None):
-            self.logger.debug(f"handle_after_play skipped for GID {gid} due to seek.")
-            return
-        if error:
-            self.logger.error(f"Error after playing track for GID {gid}: {error}")
+                    except TrackFailedError as e:
+                        failure = e.failure
+                        if e.failure == TIMEOUT and attempt < max_retries - 1:
+                            # Slow, not broken: retried below like any other error.
+                            self.logger.warning(f"Attempt {attempt + 1} timed out: {e}")
+                            await asyncio.sleep(1)
+                            continue
+                        # Dead/locked video or no usable format: retrying won't help.
+                        self.logger.warning(f"Skipping {next_track.title} ({e.failure}): {e}")
+                        break
+                    except Exception as e:
+                        failure = None
+                        self.logger.warning(f"Attempt {attempt + 1} failed: {str(e)}")
+                        if attempt < max_retries - 1:
+                            await asyncio.sleep(1)  # Wait before retry
 
-        self.bot.loop.create_task(self.play_next(ctx, gid))
+                if ctx and ctx.channel:
+                    reason = f" ({failure})" if failure else ""
+                    try:
+                        await ctx.send(
+                            f"❌ Failed to play: **{next_track.title}**{reason} - Skipping..."
+                        )
+                    except Exception as e:
+                        self.logger.warning(f"Failed to announce skipped track in GID {gid}: {e}")
+                self.logger.error(f"Error starting track {next_track.title} for GID {gid}")
+
+            if not queue:
+                loader_task = player.playlist_task
+                if loader_task and not loader_task.done():
+                    # The playlist consumer posts a "tracks" event when the next page lands.
+                    self.logger.info(f"GID {gid}: Queue empty, waiting for next playlist page...")
+                else:
+                    self.logger.info(f"GID {gid}: Queue empty. Playback finished.")
+        finally:
+            # Also on an unexpected error, so the player never sticks in LOADING.
+            if not started:
+                player.current = None
+                player.state = IDLE
+                player.ended_at = None  # the next start is not a transition
+
+    def _is_busy(self, ctx, gid: str) -> bool:
+        """Whether a new track should be queued rather than started now."""
+        vc = ctx.voice_client
+        if vc and (vc.is_playing() or vc.is_paused()):
+            return True
+        player = self.players.get(gid)
+        # LOADING: the player loop is starting the next track; PAUSED covers auto-pause.
+        return player is not None and player.state in (LOADING, PAUSED)
 
     async def _ensure_voice(self, ctx):
         """Checks if the user is in a voice channel and connects/moves the bot."""
@@ -491,117 +1476,138 @@ class MusicCommands(commands.Cog):
 
         # Playlist expansion (first track plays, rest resolved in background)
         if is_playlist_url:
+            playlist_url = self._canonical_playlist_url(target)
+            stream = self._open_playlist_stream(playlist_url, gid)
+
+            player = self.players.ensure(gid)
+            previous = player.playlist_task
+            if previous and not previous.done():
+                player.playlist_task = self.bot.loop.create_task(
+                    self._consume_playlist_stream(gid, stream, after=previous)
+                )
+                await ctx.send(
+                    "Playlist queued; it will be added once the current playlist finishes loading."
+                )
+                return
+
             try:
-                playlist_url = self._canonical_playlist_url(target)
-                entries = await self._fetch_playlist_tracks(playlist_url)
+                entries = await stream.next_page(timeout=PLAYLIST_FIRST_PAGE_TIMEOUT)
+            except asyncio.TimeoutError:
+                entries = None
+                self.logger.warning(f"Timeout fetching playlist info for {playlist_url}")
             except Exception as e:
-                entries = []
+                entries = None
                 self.logger.error(
                     f"Failed to expand playlist for '{target}' in GID {gid}: {e}"
                 )
             if entries:
-                # Cancel any previous loader
-                existing = self.loading_tasks.get(gid)
-                if existing and not existing.done():
-                    existing.cancel()
+                # Queue entries unresolved; only the prefetch window gets stream URLs.
+                pending = await self._tracks_from_entries(entries)
+                more = "" if stream.done else " (loading more...)"
+
+                if self._is_busy(ctx, gid):
+                    queue.extend(pending)
+                    self._start_playlist_consumer(gid, stream)
+                    self._prefetch_upcoming(gid)
+                    await ctx.send(f"Queued **{len(pending)}** tracks from playlist{more}.")
+                    return
 
-                # Resolve first playable entry; keep the rest for background loading
+                # Resolve the first playable entry now so playback starts immediately
                 first_track = None
-                remaining_entries = list(entries)
-                while remaining_entries and not first_track:
-                    candidate = remaining_entries.pop(0)
+                while pending and not first_track:
+                    candidate = pending.pop(0)
                     try:
-                        candidate_full = await self._fetch_track_info(candidate["target"])
+                        await self._ensure_fresh_url(candidate, gid=gid)
                     except Exception as e:
                         self.logger.warning(
-                            f"Error resolving playlist entry {candidate.get('target')}: {e}"
+                            f"Error resolving playlist entry {candidate.webpage_url}: {e}"
                         )
                         continue
-                    url = candidate_full.get("url")
-                    if not url:
-                        continue
-                    first_track = {
-                        "title": candidate_full.get("title")
-                        or candidate.get("title")
-                        or "Unknown Title",
-                        "url": url,
-                        "duration": candidate_full.get("duration")
-                        or candidate.get("duration"),
-                        "webpage_url": candidate_full.get("webpage_url")
-                        or candidate.get("target"),
-                    }
+                    if candidate.url or self.opus_cache.contains(self._metadata_key(candidate)):
+                        first_track = candidate
 
                 if not first_track:
+                    stream.close()
                     await ctx.send("Couldn't find a playable track in that playlist.")
                     return
 
-                loading_queue = self.loading_queues.setdefault(gid, [])
-                loading_queue.clear()
-                loading_queue.extend(remaining_entries)
-
-                if ctx.voice_client and ctx.voice_client.is_playing():
-                    queue.append(first_track)
+                queue.extend(pending)
+                self._start_playlist_consumer(gid, stream)
+                try:
+                    await self._start_track(ctx, gid, first_track, announce=False)
                     await ctx.send(
-                        f"Queued first playlist track: **{first_track['title']}**\n"
-                        f"Loading {len(loading_queue)} more in the background..."
+                        f"Now playing: **{first_track.title}**\n"
+                        f"Queued {len(pending)} more from playlist{more}"
+                    )
+                except Exception as e:
+                    await ctx.send(f"Unable to start first playlist track: {e}")
+                    self.logger.error(
+                        f"Error starting playlist track for GID {gid}: {e}"
                     )
-                else:
-                    try:
-                        await self._start_track(ctx, gid, first_track, announce=False)
-                        await ctx.send(
-                            f"Now playing: **{first_track['title']}**\n"
-                            f"Loading {len(loading_queue)} more from playlist..."
-                        )
-                    except Exception as e:
-                        await ctx.send(f"Unable to start first playlist track: {e}")
-                        self.logger.error(
-                            f"Error starting playlist track for GID {gid}: {e}"
-                        )
-                        return
-
-                if loading_queue:
-                    task = self.bot.loop.create_task(self._background_load_playlist(ctx, gid))
-                    self.loading_tasks[gid] = task
                 return
+            stream.close()
             # If playlist expansion failed, fall through to single track handling
 
-        ydl_target = target if is_url else f"ytsearch1:{target}"
+        ydl_target = search_target = target if is_url else f"ytsearch1:{target}"
+        query_key = None if is_url else inflight_key_for_target(ydl_target)
+        stored_id = None
+        if query_key:
+            # A query resolved before (even before a restart) skips the search step.
+            try:
+                stored_id = await find_track_by_query(query_key)
+            except Exception as e:
+                stored_id = None
+                self.logger.warning(f"Failed to look up stored query '{target}': {e}")
+            if stored_id:
+                ydl_target = stored_id
 
-        try:
-            track_info = await self._fetch_track_info(ydl_target)
-        except Exception as e:
-            await ctx.send(f"Unable to fetch track: {e}")
-            self.logger.error(
-                f"Failed to fetch track for '{query}' in GID {gid}: {e}"
-            )
-            return
+        track = await self._track_from_disk_cache(ydl_target)
+        if track is None:
+            try:
+                try:
+                    track_info = await self._fetch_track_info(ydl_target, gid=gid)
+                except TrackFailedError as e:
+                    if not stored_id:
+                        raise
+                    # The stored video went away; search the query again.
+                    self.logger.info(
+                        f"Stored track {stored_id} for '{target}' failed ({e.failure}); searching again"
+                    )
+                    try:
+                        await forget_track_query(query_key)
+                    except Exception as forget_error:
+                        self.logger.warning(
+                            f"Failed to drop stored query '{target}': {forget_error}"
+                        )
+                    track_info = await self._fetch_track_info(search_target, gid=gid)
+            except Exception as e:
+                await ctx.send(f"Unable to fetch track: {e}")
+                self.logger.error(
+                    f"Failed to fetch track for '{query}' in GID {gid}: {e}"
+                )
+                return
 
-        if not track_info or "url" not in track_info:
-            await ctx.send("Couldn't find a playable audio source for that request.")
-            return
+            if not track_info or "url" not in track_info:
+                await ctx.send("Couldn't find a playable audio source for that request.")
+                return
 
-        track = {
-            "title": track_info.get("title") or "Unknown Title",
-            "url": track_info.get("url"),
-            "duration": track_info.get("duration"),
-            "webpage_url": track_info.get("webpage_url") or track_info.get("url"),
-        }
+            track = Track.from_info(track_info)
 
-        if ctx.voice_client and ctx.voice_client.is_playing():
+        if self._is_busy(ctx, gid):
             queue.append(track)
-            await ctx.send(f"Added to queue: **{track['title']}**")
+            await ctx.send(f"Added to queue: **{track.title}**")
         else:
             try:
                 await self._start_track(ctx, gid, track, announce=False)
-                await ctx.send(f"Now playing: **{track['title']}**")
+                await ctx.send(f"Now playing: **{track.title}**")
             except Exception as e:
                 await ctx.send(f"Error starting playback: {e}")
                 self.logger.error(
-                    f"Error starting playback for {track.get('title', 'N/A')} in GID {gid}: {e}"
+                    f"Error starting playback for {track.title} in GID {gid}: {e}"
                 )
 
     @commands.hybrid_command(
-        help="Search YouTube and choose a song to play.\nUsage: !search <query>\nShows top 5 results and lets you choose.\nExample: !search never gonna give you up"
+        help="Search YouTube and choose a song to play.\nUsage: !search <query>\nShows top 5 results with a menu to choose from.\nExample: !search never gonna give you up"
     )
     async def search(self, ctx, *, query: str):
         if not ctx.voice_client:
@@ -618,22 +1624,11 @@ class MusicCommands(commands.Cog):
             await ctx.defer()
 
         gid = str(ctx.guild.id)
-        loop = self.bot.loop
         await ctx.send(f"🔍 Searching YouTube for '{query}'...")
 
         try:
-            ydl_opts_search = YDL_OPTIONS.copy()
-            ydl_opts_search["noplaylist"] = True
-            ydl_opts_search["socket_timeout"] = 30
-            ydl = youtube_dl.YoutubeDL(ydl_opts_search)
-
-            info = await asyncio.wait_for(
-                loop.run_in_executor(
-                    None,
-                    functools.partial(
-                        ydl.extract_info, f"ytsearch5:{query}", download=False
-                    ),
-                ),
+            entries = await asyncio.wait_for(
+                self.extraction.submit(ytdl_jobs.search, query, 5, guild_id=gid),
                 timeout=30.0,
             )
         except asyncio.TimeoutError:
@@ -644,64 +1639,51 @@ class MusicCommands(commands.Cog):
             self.logger.error(f"Error processing search '{query}': {e}")
             return
 
-        entries = info.get("entries", [])
         if not entries:
             await ctx.send("? No results found.")
             return
+        results = [Track.from_entry(entry) for entry in entries]
+        await self._apply_stored_metadata(results)
 
-        entries = entries[:5]
         lines = []
-        for i, entry in enumerate(entries, start=1):
-            duration = entry.get("duration")
+        durations = []
+        for i, result in enumerate(results, start=1):
+            duration = result.duration
             duration_str = f" ({self._format_duration(duration)})" if duration else ""
-            lines.append(f"{i}. {entry.get('title', 'Unknown Title')}{duration_str}")
+            lines.append(f"{i}. {result.title}{duration_str}")
+            durations.append(self._format_duration(duration) if duration else None)
 
         embed = discord.Embed(
             title="Search Results",
             description="\n".join(lines),
             color=0x5865F2,
         )
-        embed.set_footer(text="React with 1-5 to choose. Expires in 30s.")
-        msg = await ctx.send(embed=embed)
-
-        number_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
-        available_emojis = number_emojis[: len(entries)]
-        for emoji in available_emojis:
-            try:
-                await msg.add_reaction(emoji)
-            except discord.Forbidden:
-                await ctx.send("❌ I need permission to add reactions in this channel.")
-                return
-            except discord.HTTPException:
-                pass
-
-        def reaction_check(reaction, user):
-            return (
-                user == ctx.author
-                and reaction.message.id == msg.id
-                and str(reaction.emoji) in available_emojis
-            )
+        embed.set_footer(text="Choose a result from the menu. Expires in 30s.")
+        view = SearchResultsView(
+            ctx.author.id,
+            [f"{i}. {result.title}" for i, result in enumerate(results, start=1)],
+            durations,
+            timeout=30.0,
+        )
+        msg = await ctx.send(embed=embed, view=view)
 
-        try:
-            reaction, user = await self.bot.wait_for(
-                "reaction_add", timeout=30.0, check=reaction_check
-            )
-        except asyncio.TimeoutError:
+        await view.wait()
+        if view.selection is None:
             embed.set_footer(text="Selection timed out.")
             try:
-                await msg.edit(embed=embed)
+                await msg.edit(embed=embed, view=None)
             except discord.HTTPException:
                 pass
             return
 
-        selection = available_emojis.index(str(reaction.emoji))
-        selected_entry = entries[selection]
+        selection = view.selection
+        selected_entry = results[selection]
 
-        selected_url = selected_entry.get("webpage_url") or selected_entry.get("url")
+        selected_url = selected_entry.webpage_url
         if selected_url and not selected_url.startswith("http"):
             selected_url = f"https://www.youtube.com/watch?v={selected_url}"
         try:
-            fetched = await self._fetch_track_info(selected_url)
+            fetched = await self._fetch_track_info(selected_url, gid=gid)
         except Exception as e:
             await ctx.send(f"❌ Error fetching track details: {e}")
             self.logger.error(
@@ -709,13 +1691,11 @@ class MusicCommands(commands.Cog):
             )
             return
 
-        track_info = {
-            "url": fetched.get("url"),
-            "title": fetched.get("title", selected_entry.get("title", "Unknown Title")),
-            "webpage_url": fetched.get("webpage_url") or selected_url,
-            "duration": fetched.get("duration", selected_entry.get("duration")),
-        }
-        if not track_info["url"]:
+        track_info = Track.from_info(fetched, fallback_url=selected_url)
+        if not track_info.has_title:
+            track_info.title = selected_entry.title
+        track_info.duration = track_info.duration or selected_entry.duration
+        if not track_info.url:
             await ctx.send("❌ Couldn't find a playable source for that selection.")
             return
 
@@ -728,8 +1708,8 @@ class MusicCommands(commands.Cog):
         )
         embed.set_footer(
             text=(
-                f"Selected {selection + 1}: {track_info.get('title', 'Unknown Title')} "
-                f"({self._format_duration(track_info.get('duration'))})"
+                f"Selected {selection + 1}: {track_info.title} "
+                f"({self._format_duration(track_info.duration)})"
             )
         )
         try:
@@ -737,22 +1717,17 @@ class MusicCommands(commands.Cog):
         except discord.HTTPException:
             pass
 
-        try:
-            await msg.remove_reaction(reaction.emoji, user)
-        except (discord.Forbidden, discord.HTTPException):
-            pass
-
-        if ctx.voice_client.is_playing():
+        if self._is_busy(ctx, gid):
             queue.append(track_info)
-            await ctx.send(f"➕ Added to queue: **{track_info['title']}**")
+            await ctx.send(f"➕ Added to queue: **{track_info.title}**")
         else:
             try:
                 await self._start_track(ctx, gid, track_info, announce=False)
-                await ctx.send(f"🎶 Now playing: **{track_info['title']}**")
+                await ctx.send(f"🎶 Now playing: **{track_info.title}**")
             except Exception as e:
                 await ctx.send(f"❌ Error starting playback for selected track: {e}")
                 self.logger.error(
-                    f"Error playing selected search track {track_info.get('title', 'N/A')}: {e}"
+                    f"Error playing selected search track {track_info.title}: {e}"
                 )
 
 
@@ -764,53 +1739,59 @@ class MusicCommands(commands.Cog):
     )
     async def queue_list(self, ctx):
         gid = str(ctx.guild.id)
-        queue = self.queues.get(gid, [])
-        loading_queue = self.loading_queues.get(gid, [])
+        player = self.players.get(gid)
+        queue = player.queue if player else TrackQueue()
 
         msg = ""
-        current = self.current_tracks.get(gid)
+        current = player.current if player else None
         if current:
-            duration = current.get("duration")
+            duration = current.duration
             duration_str = f" ({self._format_duration(duration)})" if duration else ""
-            msg += f"🎵 **Now Playing:** {current['title']}{duration_str}\n\n"
+            msg += f"🎵 **Now Playing:** {current.title}{duration_str}\n\n"
 
-        if not queue and not loading_queue and not current:
+        if not queue and not current:
             await ctx.send("📭 The queue is empty and nothing is loading.")
             return
 
         if queue:
+            shown = queue.head(10)
+            await self._apply_stored_metadata(shown)
             msg += f"📋 **Queue ({len(queue)} song(s)):**\n"
-            for i, track in enumerate(queue[:10], start=1):
-                duration = track.get("duration")
+            for i, track in enumerate(shown, start=1):
+                duration = track.duration
                 duration_str = (
                     f" ({self._format_duration(duration)})" if duration else ""
                 )
-                msg += f"{i}. {track['title']}{duration_str}\n"
+                msg += f"{i}. {track.title}{duration_str}\n"
             if len(queue) > 10:
                 msg += f"... and {len(queue) - 10} more.\n"
         else:
             msg += "📭 **Queue is empty.**\n"
 
-        if loading_queue:
-            task_running = (
-                gid in self.loading_tasks and not self.loading_tasks[gid].done()
-            )
-            status = "currently loading" if task_running else "pending load"
-            msg += f"\n⏳ **({len(loading_queue)} track(s) {status}...)**"
+        if queue:
+            window = queue.head(PREFETCH_WINDOW)
+            ready = sum(1 for track in window if not self._needs_resolution(track))
+            task_running = player.loading_task is not None and not player.loading_task.done()
+            status = " (resolving...)" if task_running else ""
+            msg += f"\n⏳ **{ready}/{len(window)} upcoming track(s) ready{status}**"
+
+        stream = player.playlist_stream if player else None
+        if stream and not stream.done:
+            msg += f"\n📥 **Loading playlist... {stream.received} track(s) received so far**"
 
         await ctx.send(msg)
 
     @commands.hybrid_command(help="Show the currently playing track.\nUsage: !np")
     async def np(self, ctx):
         gid = str(ctx.guild.id)
-        current = self.current_tracks.get(gid)
+        current = self._current_track(gid)
         if current:
-            duration = current.get("duration")
+            duration = current.duration
             duration_str = f" ({self._format_duration(duration)})" if duration else ""
             position = self._get_current_position(gid)
             position_str = f" - {self._format_duration(position)}" if position else ""
             await ctx.send(
-                f"🎵 **Now playing:** {current['title']}{duration_str}{position_str}"
+                f"🎵 **Now playing:** {current.title}{duration_str}{position_str}"
             )
         else:
             await ctx.send("❌ No track is currently playing.")
@@ -820,29 +1801,25 @@ class MusicCommands(commands.Cog):
     )
     async def source(self, ctx):
         gid = str(ctx.guild.id)
-        current = self.current_tracks.get(gid)
+        current = self._current_track(gid)
 
         if not current:
             await ctx.send("❌ No track is currently playing.")
             return
 
-        source_url = (
-            current.get("webpage_url")
-            or current.get("original_url")
-            or current.get("url")
-        )
-        duration = current.get("duration")
+        source_url = current.webpage_url or current.url
+        duration = current.duration
         position = self._get_current_position(gid)
 
         embed = discord.Embed(
-            title=current.get("title", "Unknown track"),
+            title=current.title,
             description="Source info for the current track.",
             url=source_url if source_url else discord.Embed.Empty,
             color=discord.Color.blurple(),
         )
 
-        if current.get("uploader"):
-            embed.add_field(name="Channel", value=current["uploader"], inline=True)
+        if current.uploader:
+            embed.add_field(name="Channel", value=current.uploader, inline=True)
         if duration is not None:
             embed.add_field(
                 name="Duration", value=self._format_duration(duration), inline=True
@@ -855,8 +1832,8 @@ class MusicCommands(commands.Cog):
             embed.add_field(
                 name="Source", value=f"[Open on YouTube]({source_url})", inline=False
             )
-        if current.get("thumbnail"):
-            embed.set_thumbnail(url=current["thumbnail"])
+        if current.thumbnail:
+            embed.set_thumbnail(url=current.thumbnail)
 
         await ctx.send(embed=embed)
 
@@ -870,61 +1847,100 @@ class MusicCommands(commands.Cog):
         else:
             await ctx.send("❌ I'm not connected to a voice channel.")
 
+    def _parse_seek_target(self, arg: str, current: float) -> float | None:
+        """Parse `mm:ss`, `hh:mm:ss`, plain seconds or a relative `+N`/`-N`."""
+        arg = arg.strip()
+        relative = arg[:1] in ("+", "-")
+        body = arg[1:] if relative else arg
+        try:
+            seconds = 0.0
+            for part in body.split(":"):
+                seconds = seconds * 60 + float(part)
+        except ValueError:
+            return None
+        if body.count(":") > 2 or seconds < 0:
+            return None
+        if relative:
+            return current + seconds if arg[0] == "+" else current - seconds
+        return seconds
+
     @commands.hybrid_command(
-        help="Remove tracks from the queue.\nUsage: !remove <position>\nOptions:\n- Number (1-10): Remove track at position\n- 'first': Remove first track\n- 'last': Remove last track\n- 'all': Clear queue & loading queue\n- Text: Remove first matching track\nExample: !remove 3"
+        help="Jump to a position in the current track.\nUsage: !seek <mm:ss|+N|-N>\nExamples: !seek 1:30, !seek +15, !seek -10"
     )
-    async def remove(self, ctx, arg: str):
+    async def seek(self, ctx, position: str):
         gid = str(ctx.guild.id)
-        queue = self.get_guild_queue(gid)
-        loading_queue = self.loading_queues.get(gid, [])
-        loading_lock = self.loading_locks.get(gid)
+        vc = ctx.voice_client
+        current = self._current_track(gid)
+        if not vc or not current or not (vc.is_playing() or vc.is_paused()):
+            await ctx.send("❌ No track is currently playing.")
+            return
+
+        now = self._get_current_position(gid) or 0.0
+        target = self._parse_seek_target(position, now)
+        if target is None:
+            await ctx.send("❌ Use a time like `1:30`, seconds like `90`, or `+15`/`-10`.")
+            return
+        duration = current.duration
+        if not duration:
+            await ctx.send("❌ This track can't be seeked (unknown length or livestream).")
+            return
+        target = min(max(0.0, target), max(0.0, duration - 1))
+
+        try:
+            # Reuses the resolved stream URL or cached file; re-extracts only if expired.
+            await self._ensure_fresh_url(current, margin=30, gid=gid)
+            if self._current_track(gid) is not current:
+                return
+            if not await self._restart_current(ctx, gid, target):
+                await ctx.send("❌ No track is currently playing.")
+                return
+        except Exception as e:
+            await ctx.send(f"❌ Seek failed: {e}")
+            self.logger.error(f"Seek failed for GID {gid}: {e}")
+            return
+        await ctx.send(f"⏩ Seeked to **{self._format_duration(target)}**.")
 
-        if not queue and not loading_queue:
+    @commands.hybrid_command(
+        help="Remove tracks from the queue.\nUsage: !remove <position>\nOptions:\n- Number (1-10): Remove track at position\n- 'first': Remove first track\n- 'last': Remove last track\n- 'all': Clear the queue\n- Text: Remove first matching track\nExample: !remove 3"
+    )
+    async def remove(self, ctx, arg: str):
+        gid = str(ctx.guild.id)
+        player = self.players.get(gid)
+        if player is None or not player.queue:
             await ctx.send("📭 The queue is empty.")
             return
+        queue = player.queue
 
         arg_lower = arg.lower()
         removed_title = "Unknown Title"
 
         if arg_lower == "all":
             count = len(queue)
-            loading_count = 0
-            self.queues[gid] = []
-            if loading_lock:
-                async with loading_lock:
-                    loading_count = len(loading_queue)
-                    self.loading_queues[gid] = []
-            if gid in self.loading_tasks:
-                try:
-                    if not self.loading_tasks[gid].done():
-                        self.loading_tasks[gid].cancel()
-                        self.logger.info(
-                            f"Cancelled background loader task for GID {gid} due to !remove all."
-                        )
-                    del self.loading_tasks[gid]
-                except KeyError:
-                    pass
-                except Exception as e:
-                    self.logger.error(
-                        f"Error cancelling background task for GID {gid}: {e}"
-                    )
+            self._cancel_playlist_loading(gid)
+            async with player.loading_lock:
+                queue.clear()
+            self._discard_prespawn(gid)
+            loading_task, player.loading_task = player.loading_task, None
+            if loading_task and not loading_task.done():
+                loading_task.cancel()
+                self.logger.info(
+                    f"Cancelled prefetch task for GID {gid} due to !remove all."
+                )
 
-            await ctx.send(
-                f"🗑️ Cleared the queue. Removed {count} track(s) and {loading_count} loading track(s)."
-            )
+            await ctx.send(f"🗑️ Cleared the queue. Removed {count} track(s).")
             return
 
         elif arg_lower == "first":
             if queue:
-                removed = queue.pop(0)
-                removed_title = removed.get("title", removed_title)
+                removed = queue.popleft()
+                removed_title = removed.title
             else:
                 await ctx.send("📭 Queue is empty, cannot remove first.")
                 return
         elif arg_lower == "last":
             if queue:
-                removed = queue.pop(-1)
-                removed_title = removed.get("title", removed_title)
+                removed = queue.pop()
+                removed_title = removed.title
             else:
                 await ctx.send("📭 Queue is empty, cannot remove last.")
                 return
@@ -934,19 +1950,14 @@ class MusicCommands(commands.Cog):
                 if index < 1 or index > len(queue):
                     await ctx.send(f"❌ Index must be between 1 and {len(queue)}.")
                     return
-                removed = queue.pop(index - 1)
-                removed_title = removed.get("title", removed_title)
+                removed = queue.remove_at(index - 1)
+                removed_title = removed.title
             except ValueError:
-                search_term = arg_lower
-                found_index = -1
-                for i, track in enumerate(queue):
-                    if search_term in track.get("title", "").lower():
-                        found_index = i
-                        break
+                found_index = queue.find(arg)
 
                 if found_index != -1:
-                    removed = queue.pop(found_index)
-                    removed_title = removed.get("title", removed_title)
+                    removed = queue.remove_at(found_index)
+                    removed_title = removed.title
                 else:
                     await ctx.send(
                         "❌ No track found in the queue matching that index or title."
@@ -956,6 +1967,8 @@ class MusicCommands(commands.Cog):
                 await ctx.send("❌ Invalid index specified.")
                 return
 
+        self._check_prespawn(gid)
+        self._prefetch_upcoming(gid)
         await ctx.send(f"🗑️ Removed track: **{removed_title}**")
 
     @commands.hybrid_command(
@@ -964,7 +1977,7 @@ class MusicCommands(commands.Cog):
     async def volume(self, ctx, vol: int = None):
         gid = str(ctx.guild.id)
         if vol is None:
-            current_volume = int(self.volumes.get(gid, 1.0) * 100)
+            current_volume = int(self.settings.get(gid, "volume") * 100)
             await ctx.send(
                 f"🔊 Current volume for this server is **{current_volume}%**."
             )
@@ -974,13 +1987,19 @@ class MusicCommands(commands.Cog):
             return
 
         target_volume = vol / 100.0
-        self.volumes[gid] = target_volume
-
-        try:
-            with open(self.volumes_file, "w") as f:
-                json.dump(self.volumes, f, indent=4)
-        except Exception as e:
-            self.logger.error(f"Failed to save volumes to {self.volumes_file}: {e}")
+        # Written behind in a batch; the in-memory value applies immediately.
+        self.settings.set(gid, "volume", target_volume)
+
+        player = self.players.get(gid)
+        held = player.prespawned if player else None
+        if held and isinstance(held[1], discord.PCMVolumeTransformer):
+            held[1].volume = target_volume
+        elif held:
+            # Primed at the old volume; spawn it again.
+            self._discard_prespawn(gid)
+            current = player.current
+            if current:
+                self._schedule_prespawn(gid, current)
 
         if (
             ctx.voice_client
@@ -988,39 +2007,24 @@ class MusicCommands(commands.Cog):
             and isinstance(ctx.voice_client.source, discord.PCMVolumeTransformer)
         ):
             ctx.voice_client.source.volume = target_volume
+        elif ctx.voice_client and ctx.voice_client.source:
+            # Opus output carries volume in ffmpeg's filter graph; respawn at the playhead,
+            # or at the live edge for a livestream (no duration), which cannot be seeked.
+            current = self._current_track(gid)
+            position = 0.0
+            if current and current.duration:
+                position = self._get_current_position(gid) or 0.0
+            try:
+                await self._restart_current(ctx, gid, position)
+            except Exception as e:
+                self.logger.error(f"Failed to apply volume change for GID {gid}: {e}")
         await ctx.send(f"🔊 Volume set to **{vol}%** for this server.")
 
     @commands.hybrid_command(help="Stop playback and disconnect the bot.\nUsage: !stop")
     async def stop(self, ctx):
         gid = str(ctx.guild.id)
-        if gid in self.loading_tasks:
-            try:
-                if not self.loading_tasks[gid].done():
-                    self.loading_tasks[gid].cancel()
-                    self.logger.info(
-                        f"Cancelled background loader task for GID {gid} due to !stop."
-                    )
-                del self.loading_tasks[gid]
-            except KeyError:
-                pass
-            except Exception as e:
-                self.logger.error(
-                    f"Error cancelling background task during stop for GID {gid}: {e}"
-                )
-
-        if gid in self.queues:
-            self.queues[gid] = []
-        if gid in self.loading_locks:
-            try:
-                if gid in self.loading_queues:
-                    self.loading_queues[gid] = []
-            except Exception as e:
-                self.logger.error(
-                    f"Error clearing loading queue during stop for GID {gid}: {e}"
-                )
-
-        if gid in self.current_tracks:
-            self.current_tracks[gid] = None
+        # Cancels playlist loading, prefetch and pre-spawn and drops the queue.
+        self._dispose_player(gid, "stop")
 
         if ctx.voice_client:
             try:
@@ -1038,9 +2042,10 @@ class MusicCommands(commands.Cog):
     async def pause(self, ctx):
         if ctx.voice_client and ctx.voice_client.is_playing():
             ctx.voice_client.pause()
-            gid = str(ctx.guild.id)
-            loop = self.bot.loop
-            self.pause_start_time[gid] = loop.time()
+            player = self.players.get(str(ctx.guild.id))
+            if player:
+                player.pause_start_time = self.bot.loop.time()
+                player.state = PAUSED
             await ctx.send("⏸️ Music has been paused.")
         elif ctx.voice_client and ctx.voice_client.is_paused():
             await ctx.send("⏸️ Music is already paused.")
@@ -1052,11 +2057,14 @@ class MusicCommands(commands.Cog):
         if ctx.voice_client and ctx.voice_client.is_paused():
             ctx.voice_client.resume()
             gid = str(ctx.guild.id)
-            loop = self.bot.loop
-            pause_start = self.pause_start_time.pop(gid, None)
-            if pause_start and gid in self.playback_start_time:
-                pause_duration = loop.time() - pause_start
-                self.playback_start_time[gid] += pause_duration
+            player = self.players.get(gid)
+            pause_start = player.pause_start_time if player else None
+            if player:
+                player.pause_start_time = None
+                player.state = PLAYING
+            if pause_start and player.playback_start_time is not None:
+                pause_duration = self.bot.loop.time() - pause_start
+                player.playback_start_time += pause_duration
                 self.logger.debug(
                     f"Resumed GID {gid}. Adjusted start time by {pause_duration:.2f}s."
                 )
@@ -1070,6 +2078,196 @@ class MusicCommands(commands.Cog):
         else:
             await ctx.send("❌ Music is not paused or playing.")
 
+    @commands.command(
+        name="music_stats",
+        help="Show music subsystem cache statistics.\nUsage: !music_stats",
+    )
+    @is_admin()
+    async def music_stats(self, ctx):
+        cache = self.track_cache.stats()
+        embed = discord.Embed(title="Music Stats", color=discord.Color.blurple())
+        embed.add_field(
+            name="Track cache",
+            value=(
+                f"Entries: {cache['entries']}/{cache['max_entries']}\n"
+                f"Hits: {cache['hits']} | Misses: {cache['misses']} "
+                f"({cache['hit_rate']:.0%} hit rate)\n"
+                f"Expired: {cache['expired']} | Evicted: {cache['evictions']}\n"
+                f"Background refreshes running: {len(self.refresh_tasks)}\n"
+                f"Extractions in flight: {len(self.inflight_extractions)} | "
+                f"Started: {self.inflight_stats['started']} | "
+                f"Coalesced: {self.inflight_stats['coalesced']} | "
+                f"Promoted: {self.inflight_stats['promoted']}"
+            ),
+            inline=False,
+        )
+        negative = self.negative_cache.stats()
+        embed.add_field(
+            name="Negative cache",
+            value=(
+                "Known bad: "
+                + ", ".join(f"{failure}={count}" for failure, count in negative["entries"].items())
+                + f"\nSkipped lookups: {negative['hits']} | Recorded: "
+                + ", ".join(f"{failure}={count}" for failure, count in negative["recorded"].items())
+            ),
+            inline=False,
+        )
+        hedge = self.hedge_policy.stats()
+        if HEDGE_EXTRACTION:
+            delay = f"{hedge['delay']:.1f}s" if hedge["delay"] is not None else "warming up"
+            hedge_value = (
+                f"Requests: {hedge['requests']} | Hedged: {hedge['hedged']} "
+                f"({hedge['hedge_rate']:.0%}) | Delay: {delay}\n"
+                f"Wins: primary={hedge['primary_wins']}, hedge={hedge['hedge_wins']} "
+                f"| Failed: {hedge['failed']}"
+            )
+        else:
+            hedge_value = "Disabled"
+        embed.add_field(name="Hedged extraction", value=hedge_value, inline=False)
+        if self.ydl_pool:
+            pool = self.ydl_pool.stats()
+            idle = ", ".join(f"{name}={count}" for name, count in pool["idle"].items())
+            pool_value = (
+                f"Idle: {idle}\n"
+                f"Created: {pool['created']} | Reused: {pool['reused']} "
+                f"| Retired: {pool['retired']}"
+            )
+        else:
+            pool_value = f"Per-process pools ({EXTRACTION_WORKERS} worker processes)"
+        embed.add_field(name="yt-dlp pool", value=pool_value, inline=False)
+        disk = self.opus_cache.stats()
+        if disk["enabled"]:
+            disk_value = (
+                f"Files: {disk['entries']} | "
+                f"{disk['bytes'] / 1048576:.0f}/{disk['max_bytes'] / 1048576:.0f} MB\n"
+                f"Hits: {disk['hits']} | Misses: {disk['misses']} "
+                f"({disk['hit_rate']:.0%} hit rate)\n"
+                f"Written: {disk['writes']} | Discarded: {disk['discarded']} "
+                f"| Evicted: {disk['evictions']} | Writing: {disk['writing']}"
+            )
+        else:
+            disk_value = "Disabled"
+        embed.add_field(name="Opus disk cache", value=disk_value, inline=False)
+        live = []
+        for vc in self.bot.voice_clients:
+            source = getattr(vc.source, "original", vc.source)
+            if isinstance(source, RingBufferedSource):
+                live.append(source.stats())
+        totals = self.readahead_totals
+        readahead_value = (
+            f"Finished tracks: {totals['tracks']} | Underruns: {totals['underruns']} "
+            f"| Stalled: {totals['stall_seconds']:.1f}s\n"
+            f"Playing: {len(live)} | Underruns now: {sum(s['underruns'] for s in live)}"
+        )
+        if live:
+            lowest = min(s["buffered"] for s in live)
+            readahead_value += f" | Lowest buffer: {lowest:.1f}/{READAHEAD_SECONDS:.1f}s"
+        embed.add_field(name="Read-ahead buffers", value=readahead_value, inline=False)
+        prespawn = self.prespawn_stats
+        embed.add_field(
+            name="Gapless pre-spawn",
+            value=(
+                f"Spawned: {prespawn['spawned']} | Used: {prespawn['used']} "
+                f"| Discarded: {prespawn['discarded']} "
+                f"| Held now: {sum(1 for player in self.players if player.prespawned)}"
+            ),
+            inline=False,
+        )
+        players = self.players.stats()
+        embed.add_field(
+            name="Guild players",
+            value=(
+                f"Live: {players['live']} | Playing: {players['playing']} "
+                f"| Loading: {players['loading']} | Paused: {players['paused']} "
+                f"(auto: {players['auto_paused']}) "
+                f"| Queued tracks: {players['queued']}\n"
+                f"Created: {players['created']} | Disposed: {players['disposed']}"
+            ),
+            inline=False,
+        )
+        gaps = sorted(self.transition_gaps)
+        transitions = self.transition_stats
+        if gaps:
+            transition_value = (
+                f"Transitions: {transitions['count']} "
+                f"| Avg: {transitions['total'] / transitions['count'] * 1000:.0f} ms "
+                f"| Max: {transitions['max'] * 1000:.0f} ms\n"
+                f"Last {len(gaps)}: p50 {gaps[len(gaps) // 2] * 1000:.0f} ms "
+                f"/ p90 {gaps[int(len(gaps) * 0.9)] * 1000:.0f} ms"
+            )
+        else:
+            transition_value = "No track transitions yet."
+        embed.add_field(name="Track transition gap", value=transition_value, inline=False)
+        settings = self.settings.stats()
+        embed.add_field(
+            name="Guild settings",
+            value=(
+                f"Guilds: {settings['guilds']} | Pending writes: {settings['pending']}\n"
+                f"Batches written: {settings['writes']} ({settings['batched']} guild updates) "
+                f"| Failed: {settings['failures']}"
+            ),
+            inline=False,
+        )
+        executor = self.extraction.stats()
+        lane_lines = []
+        for lane in (HIGH, LOW):
+            lane_stats = executor["lanes"][lane]
+            lane_lines.append(
+                f"{lane}: running {executor['running'][lane]}, queued {executor['queued'][lane]}, "
+                f"done {lane_stats['completed']}, failed {lane_stats['failed']}, "
+                f"wait avg {lane_stats['avg_wait']:.2f}s / p90 {lane_stats['p90_wait']:.2f}s "
+                f"/ max {lane_stats['max_wait']:.2f}s"
+            )
+        embed.add_field(
+            name=f"Extraction executor ({executor['max_workers']} workers)",
+            value="\n".join(lane_lines),
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command(
+        name="ffmpeg_stats",
+        help="Show running ffmpeg processes and their resource usage.\nUsage: !ffmpeg_stats",
+    )
+    @is_admin()
+    async def ffmpeg_stats(self, ctx):
+        stats = self.ffmpeg_supervisor.stats()
+        cap = stats["max_processes"] or "unlimited"
+        kinds = ", ".join(f"{kind}={count}" for kind, count in stats["kinds"].items()) or "none"
+        embed = discord.Embed(title="FFmpeg Processes", color=discord.Color.blurple())
+        embed.add_field(
+            name="Processes",
+            value=(
+                f"Running: {stats['running']} ({kinds}) | Slots: {stats['slots_in_use']}/{cap}\n"
+                f"RSS: {stats['rss'] / 1048576:.0f} MB | CPU: {stats['cpu_rate']:.0%}\n"
+                f"Spawned: {stats['spawned']} | Queued now: {stats['queued']} "
+                f"| Waited: {stats['waited']} (max {stats['wait_max']:.1f}s)\n"
+                f"Reaped: {stats['reaped']} | Killed as orphaned: {stats['killed']} "
+                f"| Killed as stuck: {stats['stalled']}"
+            ),
+            inline=False,
+        )
+        usage = sorted(
+            self.ffmpeg_supervisor.guild_usage().items(),
+            key=lambda item: (item[1]["cpu_rate"], item[1]["cpu_total"]),
+            reverse=True,
+        )
+        lines = []
+        for guild_id, guild_usage in usage[:10]:
+            guild = self.bot.get_guild(int(guild_id)) if str(guild_id).isdigit() else None
+            name = guild.name if guild else guild_id
+            lines.append(
+                f"**{name}**: {guild_usage['processes']} proc, "
+                f"{guild_usage['rss'] / 1048576:.0f} MB, {guild_usage['cpu_rate']:.0%} CPU, "
+                f"{guild_usage['cpu_total']:.0f}s total"
+            )
+        embed.add_field(
+            name="Top guilds by CPU",
+            value="\n".join(lines) or "No ffmpeg activity yet.",
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
 
 async def setup(bot):
     await bot.add_cog(MusicCommands(bot))
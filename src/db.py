@@ -6,6 +6,7 @@ import os
 from typing import Any, Dict, List, Optional, Tuple
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, UpdateOne
 from pymongo.errors import DuplicateKeyError
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -63,6 +64,9 @@ class DatabaseService:
         self.twitch_stream_status = self.db.twitch_stream_status
         self.youtube_channel_meta = self.db.youtube_channel_meta
         self.twitch_user_meta = self.db.twitch_user_meta
+        self.track_metadata = self.db.track_metadata
+        self.music_sessions = self.db.music_sessions
+        self.music_settings = self.db.music_settings
 
     # ---- Lifecycle ----------------------------------------------------- #
     async def initialize(self) -> None:
@@ -84,6 +88,10 @@ class DatabaseService:
         )
         await self.youtube_channel_meta.create_index("channel_id", unique=True)
         await self.twitch_user_meta.create_index("username", unique=True)
+        await self.track_metadata.create_index("track_id", unique=True)
+        await self.track_metadata.create_index("queries")
+        await self.music_sessions.create_index("guild_id", unique=True)
+        await self.music_settings.create_index("guild_id", unique=True)
 
     # ---- Servers ------------------------------------------------------- #
     async def add_server(self, server_id: str) -> None:
@@ -453,6 +461,98 @@ class DatabaseService:
         )
         return doc["display_name"] if doc else None
 
+    # ---- Music Track Metadata ------------------------------------------ #
+    async def get_track_metadata(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not track_ids:
+            return {}
+        cursor = self.track_metadata.find(
+            {"track_id": {"$in": list(track_ids)}}, {"_id": 0, "queries": 0}
+        )
+        return {doc["track_id"]: doc for doc in await cursor.to_list(None)}
+
+    async def find_track_by_query(self, query_key: str) -> Optional[str]:
+        doc = await self.track_metadata.find_one(
+            {"queries": query_key}, {"track_id": 1, "_id": 0}
+        )
+        return doc["track_id"] if doc else None
+
+    async def forget_track_query(self, query_key: str) -> None:
+        """Drop a query's mapping so the next lookup searches again."""
+        await self.track_metadata.update_many(
+            {"queries": query_key}, {"$pull": {"queries": query_key}}
+        )
+
+    async def upsert_track_metadata(
+        self,
+        tracks: List[Dict[str, Any]],
+        overwrite: bool = True,
+        query_key: Optional[str] = None,
+    ) -> None:
+        """Store track metadata; with overwrite=False only unknown tracks are inserted."""
+        now = datetime.utcnow()
+        operations = []
+        for track in tracks:
+            fields = {key: value for key, value in track.items() if key != "track_id"}
+            if overwrite:
+                update: Dict[str, Any] = {"$set": {**fields, "updated_at": now}}
+            else:
+                update = {"$setOnInsert": {**fields, "updated_at": now}}
+            if query_key:
+                update["$addToSet"] = {"queries": query_key}
+            operations.append(
+                UpdateOne({"track_id": track["track_id"]}, update, upsert=True)
+            )
+        if operations:
+            await self.track_metadata.bulk_write(operations, ordered=False)
+
+    # ---- Music Settings ------------------------------------------------ #
+    async def get_music_settings(self) -> Dict[str, Dict[str, Any]]:
+        cursor = self.music_settings.find({}, {"_id": 0, "updated_at": 0})
+        settings = {}
+        for doc in await cursor.to_list(None):
+            settings[doc.pop("guild_id")] = doc
+        return settings
+
+    async def upsert_music_settings(
+        self, settings: Dict[str, Dict[str, Any]], overwrite: bool = True
+    ) -> None:
+        """Write several guilds' settings in one batch; each guild's update is atomic."""
+        now = datetime.utcnow()
+        operator = "$set" if overwrite else "$setOnInsert"
+        operations = [
+            UpdateOne(
+                {"guild_id": guild_id},
+                {operator: {**values, "updated_at": now}},
+                upsert=True,
+            )
+            for guild_id, values in settings.items()
+            if values
+        ]
+        if operations:
+            await self.music_settings.bulk_write(operations, ordered=False)
+
+    # ---- Music Sessions ------------------------------------------------ #
+    async def get_music_sessions(self) -> List[Dict[str, Any]]:
+        cursor = self.music_sessions.find({}, {"_id": 0})
+        return await cursor.to_list(None)
+
+    async def replace_music_sessions(self, sessions: List[Dict[str, Any]]) -> None:
+        """Store one snapshot per guild and drop those of guilds no longer playing."""
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne(
+                {"guild_id": session["guild_id"]},
+                {**session, "saved_at": now},
+                upsert=True,
+            )
+            for session in sessions
+        ]
+        if operations:
+            await self.music_sessions.bulk_write(operations, ordered=False)
+        await self.music_sessions.delete_many(
+            {"guild_id": {"$nin": [session["guild_id"] for session in sessions]}}
+        )
+
 
 # Singleton-style service to keep current imports stable
 _db_service = DatabaseService()
@@ -639,3 +739,37 @@ async def update_stream_status(
         user_login=user_login,
         display_name=display_name,
     )
+
+
+async def get_track_metadata(track_ids: List[str]):
+    return await _db_service.get_track_metadata(track_ids)
+
+
+async def find_track_by_query(query_key: str):
+    return await _db_service.find_track_by_query(query_key)
+
+
+async def forget_track_query(query_key: str):
+    return await _db_service.forget_track_query(query_key)
+
+
+async def upsert_track_metadata(
+    tracks: List[Dict[str, Any]], overwrite: bool = True, query_key: Optional[str] = None
+):
+    return await _db_service.upsert_track_metadata(tracks, overwrite, query_key)
+
+
+async def get_music_settings():
+    return await _db_service.get_music_settings()
+
+
+async def upsert_music_settings(settings: Dict[str, Dict[str, Any]], overwrite: bool = True):
+    return await _db_service.upsert_music_settings(settings, overwrite)
+
+
+async def get_music_sessions():
+    return await _db_service.get_music_sessions()
+
+
+async def replace_music_sessions(sessions: List[Dict[str, Any]]):
+    return await _db_service.replace_music_sessions(sessions)
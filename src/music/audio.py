@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import shlex
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+import discord
+from discord.oggparse import OggStream
+from discord.opus import Encoder as OpusEncoder
+
+RECONNECT_OPTIONS = (
+    "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5 -reconnect_at_eof 1"
+)
+PCM_OUTPUT_OPTIONS = "-vn -bufsize 512k -maxrate 128k"
+OPUS_BITRATE = "128k"
+TEE_BITRATE = "128k"
+
+
+def tee_output_args(path: str, source_is_opus: bool) -> List[str]:
+    """ffmpeg output arguments that copy the audio track to an Ogg/Opus file."""
+    codec = ["-c:a", "copy"] if source_is_opus else ["-c:a", "libopus", "-b:a", TEE_BITRATE]
+    return ["-map", "0:a:0", "-vn", *codec, "-f", "opus", "-y", path]
+
+
+def volume_filter_args(volume: float) -> List[str]:
+    if abs(volume - 1.0) < 1e-3:
+        return []
+    return ["-af", f"volume={volume:.3f}"]
+
+
+class FFmpegTrackSource(discord.FFmpegAudio):
+    """FFmpeg source for one track, optionally teeing it into the disk cache.
+
+    With ``opus=True`` ffmpeg emits Ogg/Opus packets that go to Discord as-is
+    (``copy_opus`` skips re-encoding entirely when the input is already Opus);
+    volume is applied by ffmpeg's filter graph rather than per frame in Python.
+    ``opus=False`` keeps the PCM output for use with ``PCMVolumeTransformer``.
+
+    ``on_exit`` is called from the audio thread with the finished ``Popen`` once
+    the process is gone; its return code tells the caller whether a tee file
+    was written completely.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        *,
+        remote: bool = True,
+        start: float = 0.0,
+        opus: bool = True,
+        copy_opus: bool = False,
+        volume: float = 1.0,
+        tee_path: Optional[str] = None,
+        tee_copy: bool = False,
+        on_exit: Optional[Callable[[Any], None]] = None,
+        executable: str = "ffmpeg",
+    ):
+        args: List[str] = []
+        if remote:
+            args.extend(shlex.split(RECONNECT_OPTIONS))
+        if start > 0:
+            args.extend(("-ss", f"{start:.3f}"))
+        args.extend(("-i", source))
+        if tee_path:
+            args.extend(tee_output_args(tee_path, tee_copy))
+        args.extend(("-map", "0:a:0", "-vn"))
+        if opus:
+            if copy_opus:
+                args.extend(("-c:a", "copy"))
+            else:
+                args.extend(volume_filter_args(volume))
+                args.extend(("-c:a", "libopus", "-b:a", OPUS_BITRATE))
+            args.extend(("-map_metadata", "-1", "-f", "opus", "-ar", "48000", "-ac", "2"))
+        else:
+            args.extend(shlex.split(PCM_OUTPUT_OPTIONS))
+            args.extend(("-f", "s16le", "-ar", "48000", "-ac", "2"))
+        args.extend(("-loglevel", "warning", "pipe:1"))
+
+        self.opus = opus
+        self.start = start
+        self._on_exit = on_exit
+        super().__init__(source, executable=executable, args=args)
+        self._packet_iter = OggStream(self._stdout).iter_packets() if opus else None
+
+    def read(self) -> bytes:
+        if self._packet_iter is not None:
+            return next(self._packet_iter, b"")
+        ret = self._stdout.read(OpusEncoder.FRAME_SIZE)
+        if len(ret) != OpusEncoder.FRAME_SIZE:
+            return b""
+        return ret
+
+    def is_opus(self) -> bool:
+        return self.opus
+
+    @property
+    def process(self):
+        """The ffmpeg ``Popen``, or None once cleaned up."""
+        return self._process or None
+
+    def cleanup(self) -> None:
+        process = self._process
+        super().cleanup()
+        callback, self._on_exit = self._on_exit, None
+        if callback is not None and process:
+            callback(process)
+
+
+FRAMES_PER_SECOND = 50  # 20 ms frames
+PCM_SLOT_SIZE = OpusEncoder.FRAME_SIZE
+OPUS_SLOT_SIZE = 4000  # comfortably above the 1275-byte Opus packet limit
+
+
+class RingBufferedSource(discord.AudioSource):
+    """Read-ahead wrapper that keeps ``seconds`` of frames buffered ahead of playback.
+
+    A reader thread pulls frames from the wrapped source into a preallocated ring
+    of fixed-size slots, so a short stall in ffmpeg or the network drains the
+    buffer instead of stalling the voice send loop. An underrun is counted each
+    time playback finds the buffer empty after it has started.
+    """
+
+    def __init__(
+        self,
+        source: discord.AudioSource,
+        seconds: float = 5.0,
+        on_close: Optional[Callable[["RingBufferedSource"], None]] = None,
+    ):
+        self.source = source
+        self.capacity = max(2, int(seconds * FRAMES_PER_SECOND))
+        self.slot_size = OPUS_SLOT_SIZE if source.is_opus() else PCM_SLOT_SIZE
+        self._buffer = bytearray(self.capacity * self.slot_size)
+        self._view = memoryview(self._buffer)
+        self._lengths = [0] * self.capacity
+        self._head = 0  # next slot to read
+        self._count = 0
+        self._eof = False
+        self._closed = False
+        self._started = False
+        self._cond = threading.Condition()
+        self._on_close = on_close
+
+        self.frames_read = 0
+        self.underruns = 0
+        self.stall_seconds = 0.0
+        self.oversized = 0
+
+        self._reader = threading.Thread(
+            target=self._fill, name="audio-readahead", daemon=True
+        )
+        self._reader.start()
+
+    def _fill(self) -> None:
+        try:
+            while True:
+                with self._cond:
+                    while self._count >= self.capacity and not self._closed:
+                        self._cond.wait(0.5)
+                    if self._closed:
+                        return
+                data = self.source.read()
+                if not data:
+                    return
+                size = len(data)
+                if size > self.slot_size:
+                    # Cannot happen for 20 ms frames; drop rather than corrupt a neighbour.
+                    self.oversized += 1
+                    continue
+                with self._cond:
+                    if self._closed:
+                        return
+                    tail = (self._head + self._count) % self.capacity
+                    offset = tail * self.slot_size
+                    self._view[offset : offset + size] = data
+                    self._lengths[tail] = size
+                    self._count += 1
+                    self._cond.notify_all()
+        except Exception:
+            pass
+        finally:
+            with self._cond:
+                self._eof = True
+                self._cond.notify_all()
+
+    def read(self) -> bytes:
+        with self._cond:
+            if self._count == 0 and not self._eof:
+                if self._started:
+                    self.underruns += 1
+                stalled_at = time.perf_counter()
+                while self._count == 0 and not self._eof and not self._closed:
+                    self._cond.wait(0.1)
+                if self._started:
+                    self.stall_seconds += time.perf_counter() - stalled_at
+            if self._count == 0:
+                return b""
+            offset = self._head * self.slot_size
+            frame = bytes(self._view[offset : offset + self._lengths[self._head]])
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            self._started = True
+            self.frames_read += 1
+            self._cond.notify_all()
+            return frame
+
+    def is_opus(self) -> bool:
+        return self.source.is_opus()
+
+    @property
+    def exhausted(self) -> bool:
+        """True once the wrapped source has ended and every buffered frame was read."""
+        return self._eof and self._count == 0
+
+    @property
+    def starving(self) -> bool:
+        """True while playback has started but the buffer is empty and not at EOF."""
+        return self._started and self._count == 0 and not self._eof
+
+    @property
+    def buffered_seconds(self) -> float:
+        return self._count / FRAMES_PER_SECOND
+
+    def stats(self) -> dict:
+        return {
+            "buffered": self.buffered_seconds,
+            "capacity": self.capacity / FRAMES_PER_SECOND,
+            "frames": self.frames_read,
+            "underruns": self.underruns,
+            "stall_seconds": self.stall_seconds,
+        }
+
+    def cleanup(self) -> None:
+        with self._cond:
+            already_closed = self._closed
+            self._closed = True
+            self._cond.notify_all()
+        if already_closed:
+            return
+        # Killing ffmpeg unblocks a reader stuck in read().
+        self.source.cleanup()
+        if self._reader is not threading.current_thread():
+            self._reader.join(timeout=2)
+        callback, self._on_close = self._on_close, None
+        if callback is not None:
+            callback(self)
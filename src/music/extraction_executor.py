@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+HIGH = "high"
+LOW = "low"
+
+_WAIT_SAMPLES = 256
+
+
+class ExtractionJob:
+    """One queued call; ``future`` resolves with its result.
+
+    ``dispatched_at`` stays None until a worker picks the job up, so callers can
+    tell a job that ran too long from one that never left the queue.
+    """
+
+    __slots__ = ("call", "future", "lane", "guild_id", "enqueued_at", "dispatched_at")
+
+    def __init__(self, call, future, lane, guild_id):
+        self.call = call
+        self.future = future
+        self.lane = lane
+        self.guild_id = guild_id
+        self.enqueued_at = time.monotonic()
+        self.dispatched_at: Optional[float] = None
+
+    @property
+    def dispatched(self) -> bool:
+        return self.dispatched_at is not None
+
+
+class _LaneStats:
+    __slots__ = ("submitted", "completed", "failed", "cancelled", "wait_total", "wait_max", "waits")
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def record_wait(self, waited: float) -> None:
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.waits.append(waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        started = self.completed + self.failed
+        recent = sorted(self.waits)
+        p90 = recent[min(len(recent) - 1, int(len(recent) * 0.9))] if recent else 0.0
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "avg_wait": (self.wait_total / started) if started else 0.0,
+            "p90_wait": p90,
+            "max_wait": self.wait_max,
+        }
+
+
+class ExtractionExecutor:
+    """Bounded executor for yt-dlp work with an interactive and a background lane.
+
+    High-lane jobs (``!play``/``!search``) always dispatch first. Low-lane jobs
+    (playlist resolution, URL refreshes) are served round-robin per guild and
+    never occupy the last worker, so an interactive request never queues behind
+    a large playlist.
+    """
+
+    def __init__(self, max_workers: int = 4, pool=None):
+        self.max_workers = max(1, max_workers)
+        self._pool = pool or ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="ytdl"
+        )
+        self._high: Deque[ExtractionJob] = deque()
+        self._low: "OrderedDict[Any, Deque[ExtractionJob]]" = OrderedDict()
+        self._running = {HIGH: 0, LOW: 0}
+        self._stats = {HIGH: _LaneStats(), LOW: _LaneStats()}
+
+    @property
+    def _low_limit(self) -> int:
+        return self.max_workers - 1 if self.max_workers > 1 else 1
+
+    async def submit(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        lane: str = HIGH,
+        guild_id: Optional[str] = None,
+        **kwargs,
+    ) -> Any:
+        """Queue a blocking call and await its result."""
+        return await self.enqueue(fn, *args, lane=lane, guild_id=guild_id, **kwargs).future
+
+    def enqueue(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        lane: str = HIGH,
+        guild_id: Optional[str] = None,
+        **kwargs,
+    ) -> ExtractionJob:
+        """Queue a blocking call and return its job; cancelling ``job.future`` drops it if still queued."""
+        loop = asyncio.get_running_loop()
+        job = ExtractionJob(
+            functools.partial(fn, *args, **kwargs), loop.create_future(), lane, guild_id
+        )
+        self._stats[lane].submitted += 1
+        if lane == HIGH:
+            self._high.append(job)
+        else:
+            self._low.setdefault(guild_id, deque()).append(job)
+        self._dispatch()
+        return job
+
+    def promote(self, job: ExtractionJob) -> bool:
+        """Move a still-queued low-lane job to the back of the high lane.
+
+        Used when an interactive request joins background work for the same
+        target. Returns False if the job already started, finished or is high.
+        """
+        if job.lane != LOW or job.dispatched or job.future.done():
+            return False
+        jobs = self._low.get(job.guild_id)
+        if not jobs or job not in jobs:
+            return False
+        jobs.remove(job)
+        if not jobs:
+            del self._low[job.guild_id]
+        self._stats[LOW].submitted -= 1
+        self._stats[HIGH].submitted += 1
+        job.lane = HIGH
+        self._high.append(job)
+        self._dispatch()
+        return True
+
+    def _next_low_job(self) -> Optional[ExtractionJob]:
+        if not self._low:
+            return None
+        guild_id, jobs = next(iter(self._low.items()))
+        job = jobs.popleft()
+        if jobs:
+            self._low.move_to_end(guild_id)
+        else:
+            del self._low[guild_id]
+        return job
+
+    def _next_job(self) -> Optional[ExtractionJob]:
+        while True:
+            busy = self._running[HIGH] + self._running[LOW]
+            if busy >= self.max_workers:
+                return None
+            if self._high:
+                job = self._high.popleft()
+            elif self._low and self._running[LOW] < self._low_limit:
+                job = self._next_low_job()
+            else:
+                return None
+            if job.future.done():
+                self._stats[job.lane].cancelled += 1
+                continue
+            return job
+
+    def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._running[job.lane] += 1
+            job.dispatched_at = time.monotonic()
+            self._stats[job.lane].record_wait(job.dispatched_at - job.enqueued_at)
+            pool_future = loop.run_in_executor(self._pool, job.call)
+            pool_future.add_done_callback(functools.partial(self._on_done, job))
+
+    def _on_done(self, job: ExtractionJob, pool_future: asyncio.Future) -> None:
+        self._running[job.lane] -= 1
+        stats = self._stats[job.lane]
+        if pool_future.cancelled():
+            stats.cancelled += 1
+            if not job.future.done():
+                job.future.cancel()
+        elif pool_future.exception() is not None:
+            stats.failed += 1
+            if not job.future.done():
+                job.future.set_exception(pool_future.exception())
+        else:
+            stats.completed += 1
+            if not job.future.done():
+                job.future.set_result(pool_future.result())
+        self._dispatch()
+
+    def queue_depth(self) -> Dict[str, int]:
+        return {
+            HIGH: len(self._high),
+            LOW: sum(len(jobs) for jobs in self._low.values()),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        depth = self.queue_depth()
+        return {
+            "max_workers": self.max_workers,
+            "running": dict(self._running),
+            "queued": depth,
+            "low_guilds": len(self._low),
+            "lanes": {lane: stats.snapshot() for lane, stats in self._stats.items()},
+        }
+
+    def shutdown(self) -> None:
+        for job in self._high:
+            job.future.cancel()
+        for jobs in self._low.values():
+            for job in jobs:
+                job.future.cancel()
+        self._high.clear()
+        self._low.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+try:
+    _CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # non-Linux
+    _CLOCK_TICKS = 100
+    _PAGE_SIZE = 4096
+
+# Guilds whose finished-process CPU time is remembered for the usage report.
+_FINISHED_GUILDS = 512
+# CPU seconds a sweep must see a process use to count it as making progress.
+_PROGRESS_CPU = 0.01
+
+
+def read_proc_usage(pid: int) -> Optional[tuple]:
+    """(cpu_seconds, rss_bytes) for a live process from /proc, or None."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read().decode("ascii", "replace")
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            statm = f.read().split()
+    except OSError:
+        return None
+    # The command name may contain spaces; fields resume after its closing paren.
+    fields = stat[stat.rfind(")") + 2 :].split()
+    try:
+        cpu = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        rss = int(statm[1]) * _PAGE_SIZE
+    except (IndexError, ValueError):
+        return None
+    return cpu, rss
+
+
+class _Proc:
+    __slots__ = (
+        "process",
+        "guild_id",
+        "kind",
+        "started",
+        "cpu",
+        "rss",
+        "cpu_rate",
+        "sampled_at",
+        "inactive_since",
+        "stalled_since",
+    )
+
+    def __init__(self, process, guild_id, kind):
+        self.process = process
+        self.guild_id = guild_id
+        self.kind = kind
+        self.started = time.monotonic()
+        self.cpu = 0.0
+        self.rss = 0
+        self.cpu_rate = 0.0
+        self.sampled_at = self.started
+        self.inactive_since: Optional[float] = None
+        self.stalled_since: Optional[float] = None
+
+
+class FFmpegSupervisor:
+    """Registry of every ffmpeg process the music cog spawns.
+
+    Spawns take a slot from a global cap (``max_processes``, 0 = unlimited) and
+    queue FIFO when none is free; the slot is returned when the process is
+    untracked. :meth:`sweep` samples CPU/RSS from /proc, reaps processes that
+    exited without their source being cleaned up, kills processes that no
+    voice client or pre-spawn has owned for ``orphan_grace`` seconds, and kills
+    playing processes that used no CPU for ``stall_grace`` seconds while their
+    listeners were starved of audio.
+    """
+
+    def __init__(
+        self, max_processes: int = 0, orphan_grace: float = 30.0, stall_grace: float = 30.0
+    ):
+        self.max_processes = max(0, max_processes)
+        self.orphan_grace = orphan_grace
+        self.stall_grace = stall_grace
+        self._procs: Dict[int, _Proc] = {}
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # cpu seconds of exited processes, per guild (most recently active kept)
+        self._finished_cpu: "OrderedDict[Any, float]" = OrderedDict()
+
+        self.spawned = 0
+        self.waited = 0
+        self.rejected = 0
+        self.wait_max = 0.0
+        self.reaped = 0
+        self.killed = 0
+        self.stalled = 0
+
+    # ---- Slots ---------------------------------------------------------- #
+    async def acquire(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """Take a process slot, waiting in line when the cap is reached."""
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self.max_processes or (
+                self._in_use < self.max_processes and not self._waiters
+            ):
+                self._in_use += 1
+                return True
+            if not wait:
+                self.rejected += 1
+                return False
+            future = self._loop.create_future()
+            self._waiters.append(future)
+            self.waited += 1
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self.wait_max = max(self.wait_max, time.monotonic() - queued_at)
+        return True
+
+    def release(self) -> None:
+        """Return a slot; safe to call from any thread."""
+        with self._lock:
+            self._in_use = max(0, self._in_use - 1)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake_waiters)
+
+    def _wake_waiters(self) -> None:
+        with self._lock:
+            while self._waiters and (
+                not self.max_processes or self._in_use < self.max_processes
+            ):
+                future = self._waiters.popleft()
+                if future.done():
+                    continue
+                self._in_use += 1
+                future.set_result(True)
+
+    # ---- Registry ------------------------------------------------------- #
+    def track(self, process, guild_id, kind: str = "play") -> None:
+        with self._lock:
+            self._procs[process.pid] = _Proc(process, guild_id, kind)
+            self.spawned += 1
+
+    def untrack(self, process) -> None:
+        """Forget a process whose source was cleaned up, freeing its slot."""
+        with self._lock:
+            entry = self._procs.pop(getattr(process, "pid", None), None)
+            if entry is not None:
+                self._finished_cpu[entry.guild_id] = (
+                    self._finished_cpu.pop(entry.guild_id, 0.0) + entry.cpu
+                )
+                while len(self._finished_cpu) > _FINISHED_GUILDS:
+                    self._finished_cpu.popitem(last=False)
+        if entry is not None:
+            self.release()
+
+    def set_kind(self, process, kind: str) -> None:
+        with self._lock:
+            entry = self._procs.get(getattr(process, "pid", None))
+            if entry is not None:
+                entry.kind = kind
+
+    def sweep(self, active_pids: Iterable[int], starving_pids: Iterable[int] = ()) -> None:
+        """Sample usage, reap exited processes and kill orphans and stuck processes. Blocking.
+
+        ``starving_pids`` are active processes whose read-ahead buffer is
+        underrunning; one of them that also stops using CPU is stuck.
+        """
+        active = set(active_pids)
+        starving = set(starving_pids)
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._procs.values())
+        for entry in entries:
+            process = entry.process
+            if process.poll() is not None:
+                # Exited but never cleaned up by its source: reap it here.
+                self.reaped += 1
+                self.untrack(process)
+                continue
+            usage = read_proc_usage(process.pid)
+            progressed = True
+            if usage is not None:
+                cpu, rss = usage
+                elapsed = now - entry.sampled_at
+                if elapsed > 0:
+                    entry.cpu_rate = max(0.0, cpu - entry.cpu) / elapsed
+                progressed = cpu - entry.cpu >= _PROGRESS_CPU
+                entry.cpu, entry.rss, entry.sampled_at = cpu, rss, now
+            if process.pid in active:
+                entry.inactive_since = None
+                if process.pid not in starving or progressed:
+                    entry.stalled_since = None
+                elif entry.stalled_since is None:
+                    entry.stalled_since = now
+                elif now - entry.stalled_since >= self.stall_grace:
+                    # Killing it ends the track, so the player moves on instead of hanging.
+                    self._kill(process)
+                    self.stalled += 1
+                continue
+            if entry.inactive_since is None:
+                entry.inactive_since = now
+            elif now - entry.inactive_since >= self.orphan_grace:
+                self._kill(process)
+                self.killed += 1
+
+    def _kill(self, process) -> None:
+        try:
+            process.kill()
+            process.wait(timeout=5)
+        except Exception:
+            pass
+        self.untrack(process)
+
+    # ---- Reporting ------------------------------------------------------ #
+    def guild_usage(self) -> Dict[Any, Dict[str, Any]]:
+        usage: Dict[Any, Dict[str, Any]] = {}
+        with self._lock:
+            for entry in self._procs.values():
+                guild = usage.setdefault(
+                    entry.guild_id,
+                    {"processes": 0, "rss": 0, "cpu_rate": 0.0, "cpu_total": 0.0},
+                )
+                guild["processes"] += 1
+                guild["rss"] += entry.rss
+                guild["cpu_rate"] += entry.cpu_rate
+                guild["cpu_total"] += entry.cpu
+            for guild_id, cpu in self._finished_cpu.items():
+                guild = usage.setdefault(
+                    guild_id,
+                    {"processes": 0, "rss": 0, "cpu_rate": 0.0, "cpu_total": 0.0},
+                )
+                guild["cpu_total"] += cpu
+        return usage
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds: Dict[str, int] = {}
+            for entry in self._procs.values():
+                kinds[entry.kind] = kinds.get(entry.kind, 0) + 1
+            return {
+                "running": len(self._procs),
+                "kinds": kinds,
+                "slots_in_use": self._in_use,
+                "max_processes": self.max_processes,
+                "queued": sum(1 for f in self._waiters if not f.done()),
+                "spawned": self.spawned,
+                "waited": self.waited,
+                "rejected": self.rejected,
+                "wait_max": self.wait_max,
+                "reaped": self.reaped,
+                "killed": self.killed,
+                "stalled": self.stalled,
+                "rss": sum(entry.rss for entry in self._procs.values()),
+                "cpu_rate": sum(entry.cpu_rate for entry in self._procs.values()),
+            }
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, Iterator, Optional
+
+from music.track_queue import Track, TrackQueue
+
+# Player states, driven by the guild's player loop and the pause/resume paths.
+IDLE = "idle"
+LOADING = "loading"
+PLAYING = "playing"
+PAUSED = "paused"
+
+
+class GuildPlayer:
+    """Everything the music cog tracks for one guild.
+
+    Players are created lazily by :class:`PlayerRegistry` and dropped whole when
+    the guild stops, disconnects or removes the bot, so state no longer piles up
+    for every guild that ever played a track.
+    """
+
+    __slots__ = (
+        "guild_id",
+        "queue",
+        "current",
+        "loading_lock",
+        "loading_task",
+        "events",
+        "loop_task",
+        "state",
+        "ended_at",
+        "playlist_task",
+        "playlist_stream",
+        "prespawned",
+        "prespawn_task",
+        "source",
+        "playback_start_time",
+        "playback_seek_position",
+        "pause_start_time",
+        "ctx",
+        "resume_position",
+        "resume_paused",
+        "idle_since",
+    )
+
+    def __init__(self, guild_id: str):
+        self.guild_id = guild_id
+        self.queue = TrackQueue()
+        self.current: Optional[Track] = None
+        self.loading_lock = asyncio.Lock()
+        self.loading_task: Optional[asyncio.Task] = None
+        # Playback events for the guild's player loop; the only way the queue advances.
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.loop_task: Optional[asyncio.Task] = None
+        self.state = IDLE
+        # time.monotonic() when the last track ended, for the transition-gap metric
+        self.ended_at: Optional[float] = None
+        self.playlist_task: Optional[asyncio.Task] = None
+        self.playlist_stream = None
+        # (track, primed source) for the gapless hand-off to the queue head
+        self.prespawned: Optional[tuple] = None
+        self.prespawn_task: Optional[asyncio.Task] = None
+        # Source last handed to vc.play; "ended" events from any other source (one
+        # replaced by a seek, volume change or auto-pause) are ignored.
+        self.source = None
+        self.playback_start_time: Optional[float] = None
+        self.playback_seek_position = 0.0
+        self.pause_start_time: Optional[float] = None
+        # Command context playback was started from; used to announce and advance.
+        self.ctx = None
+        # Set while auto-paused for an empty voice channel (ffmpeg stopped).
+        self.resume_position: Optional[float] = None
+        self.resume_paused = False
+        self.idle_since: Optional[float] = None
+
+    @property
+    def paused(self) -> bool:
+        return self.pause_start_time is not None
+
+    @property
+    def auto_paused(self) -> bool:
+        return self.resume_position is not None
+
+    def position(self, now: float) -> Optional[float]:
+        """Estimated playback position in seconds at loop time ``now``."""
+        if self.playback_start_time is None:
+            return None
+        elapsed = now - self.playback_start_time
+        if self.pause_start_time is not None:
+            elapsed -= now - self.pause_start_time
+        return self.playback_seek_position + max(0.0, elapsed)
+
+    def mark_started(self, now: float, position: float = 0.0, paused: bool = False) -> None:
+        self.playback_start_time = now
+        self.playback_seek_position = position
+        self.pause_start_time = now if paused else None
+
+    def close(self) -> Optional[Any]:
+        """Cancel background work and drop the queue.
+
+        Returns the pre-spawned source, if any, for the caller to clean up off
+        the event loop.
+        """
+        tasks = (self.loading_task, self.playlist_task, self.prespawn_task, self.loop_task)
+        for task in tasks:
+            if task is not None and not task.done():
+                task.cancel()
+        self.loading_task = self.playlist_task = self.prespawn_task = self.loop_task = None
+        if self.playlist_stream is not None:
+            self.playlist_stream.close()
+            self.playlist_stream = None
+        self.state = IDLE
+        self.queue.clear()
+        self.current = None
+        self.playback_start_time = self.pause_start_time = None
+        self.resume_position = None
+        self.ctx = None
+        self.source = None
+        held, self.prespawned = self.prespawned, None
+        return held[1] if held else None
+
+
+class PlayerContext:
+    """Stand-in for a command context when playback resumes without a command."""
+
+    __slots__ = ("guild", "channel")
+
+    def __init__(self, guild, channel=None):
+        self.guild = guild
+        self.channel = channel
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def send(self, *args, **kwargs):
+        if self.channel is None:
+            return None
+        return await self.channel.send(*args, **kwargs)
+
+
+class PlayerRegistry:
+    """Guild ID -> :class:`GuildPlayer`, with lifetime counters for the stats gauge."""
+
+    def __init__(self):
+        self._players: Dict[str, GuildPlayer] = {}
+        self.created = 0
+        self.disposed = 0
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __iter__(self) -> Iterator[GuildPlayer]:
+        return iter(list(self._players.values()))
+
+    def get(self, guild_id: str) -> Optional[GuildPlayer]:
+        return self._players.get(guild_id)
+
+    def ensure(self, guild_id: str) -> GuildPlayer:
+        player = self._players.get(guild_id)
+        if player is None:
+            player = self._players[guild_id] = GuildPlayer(guild_id)
+            self.created += 1
+        return player
+
+    def pop(self, guild_id: str) -> Optional[GuildPlayer]:
+        """Unregister a guild's player; the caller is responsible for closing it."""
+        player = self._players.pop(guild_id, None)
+        if player is not None:
+            self.disposed += 1
+        return player
+
+    def stats(self) -> Dict[str, int]:
+        players = list(self._players.values())
+        return {
+            "live": len(players),
+            "playing": sum(1 for player in players if player.state == PLAYING),
+            "loading": sum(1 for player in players if player.state == LOADING),
+            "paused": sum(1 for player in players if player.state == PAUSED),
+            "auto_paused": sum(1 for player in players if player.auto_paused),
+            "queued": sum(len(player.queue) for player in players),
+            "created": self.created,
+            "disposed": self.disposed,
+        }
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+_SAMPLES = 256
+
+
+class HedgePolicy:
+    """Races a backup request against one that is slower than usual.
+
+    Latencies of completed requests feed a sliding window; until ``min_samples``
+    have been seen no request is hedged. The hedge delay is that window's
+    ``quantile`` clamped to ``[min_delay, max_delay]``. The first attempt to
+    succeed wins and the other is cancelled; an attempt that raises or returns a
+    result ``valid`` rejects does not count as a success. The counters show how
+    often hedges were sent and which attempt won.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.9,
+        min_delay: float = 2.0,
+        max_delay: float = 15.0,
+        min_samples: int = 20,
+    ):
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=_SAMPLES)
+
+        self.requests = 0
+        self.hedged = 0
+        self.primary_wins = 0
+        self.hedge_wins = 0
+        self.failed = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        recent = sorted(self._latencies)
+        value = recent[min(len(recent) - 1, int(len(recent) * self.quantile))]
+        return min(self.max_delay, max(self.min_delay, value))
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[Any]],
+        hedge: Callable[[], Awaitable[Any]],
+        valid: Callable[[Any], Any] = bool,
+    ) -> Any:
+        """Await ``primary()``, racing ``hedge()`` against it if it runs past the delay.
+
+        If no attempt succeeds, the primary's outcome is returned (or raised).
+        """
+        self.requests += 1
+        started = time.monotonic()
+        delay = self.delay()
+        first = asyncio.ensure_future(primary())
+        tasks = {first}
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not first.done():
+                    self.hedged += 1
+                    tasks.add(asyncio.ensure_future(hedge()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Prefer the primary when both land in the same wake-up.
+                for task in sorted(done, key=lambda t: t is not first):
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    if valid(task.result()):
+                        if len(tasks) > 1:
+                            if task is first:
+                                self.primary_wins += 1
+                            else:
+                                self.hedge_wins += 1
+                        self._latencies.append(time.monotonic() - started)
+                        return task.result()
+            self.failed += 1
+            return first.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": (self.hedged / self.requests) if self.requests else 0.0,
+            "primary_wins": self.primary_wins,
+            "hedge_wins": self.hedge_wins,
+            "failed": self.failed,
+            "delay": self.delay(),
+            "samples": len(self._latencies),
+        }
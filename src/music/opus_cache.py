@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+_SAFE_KEY_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_SUFFIX = ".opus"
+_PARTIAL_SUFFIX = ".part"
+
+
+class OpusDiskCache:
+    """Size-capped LRU directory of Ogg/Opus files written while tracks play.
+
+    A track is written to a ``.part`` file by the same ffmpeg process that feeds
+    the voice client and is only published under its final name once ffmpeg
+    exits cleanly, so a skipped or failed playback never leaves a truncated file
+    behind. Recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._writing: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.discarded = 0
+        self.evictions = 0
+
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _filename(self, key: str) -> str:
+        if not _SAFE_KEY_RE.match(key):
+            key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return key + _SUFFIX
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, self._filename(key))
+
+    def _scan(self) -> None:
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(_PARTIAL_SUFFIX):
+                # Left over from a crash mid-write.
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name[: -len(_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path_for(self, key: Optional[str]) -> Optional[str]:
+        """Path of a complete cached file for ``key``, marking it recently used."""
+        if not self.enabled or not key:
+            return None
+        name = self._filename(key)[: -len(_SUFFIX)]
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def contains(self, key: Optional[str]) -> bool:
+        """Whether ``key`` is cached, without touching recency or counters."""
+        if not self.enabled or not key:
+            return False
+        with self._lock:
+            return self._filename(key)[: -len(_SUFFIX)] in self._entries
+
+    def reserve(self, key: Optional[str]) -> Optional[str]:
+        """Temporary path to tee a track into, or None if cached or already being written."""
+        if not self.enabled or not key:
+            return None
+        name = self._filename(key)[: -len(_SUFFIX)]
+        with self._lock:
+            if name in self._entries or name in self._writing:
+                return None
+            partial = os.path.join(
+                self.directory, f"{name}.{uuid.uuid4().hex[:8]}{_PARTIAL_SUFFIX}"
+            )
+            self._writing[name] = partial
+        return partial
+
+    def commit(self, key: str, partial: str) -> bool:
+        """Publish a fully written file; returns False if it was unusable."""
+        name = self._filename(key)[: -len(_SUFFIX)]
+        with self._lock:
+            self._writing.pop(name, None)
+        try:
+            size = os.path.getsize(partial)
+            if size <= 0:
+                raise OSError("empty cache file")
+            os.replace(partial, self._path(key))
+        except OSError:
+            self._remove(partial)
+            with self._lock:
+                self.discarded += 1
+            return False
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self.writes += 1
+            self._evict()
+        return True
+
+    def discard(self, key: str, partial: str) -> None:
+        """Drop an incomplete write (skipped, seeked or failed playback)."""
+        name = self._filename(key)[: -len(_SUFFIX)]
+        with self._lock:
+            self._writing.pop(name, None)
+            self.discarded += 1
+        self._remove(partial)
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            self._remove(os.path.join(self.directory, name + _SUFFIX))
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "writing": len(self._writing),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "writes": self.writes,
+                "discarded": self.discarded,
+                "evictions": self.evictions,
+            }
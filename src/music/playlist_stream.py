@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from music import ytdl_jobs
+from music.extraction_executor import HIGH, LOW
+
+
+class _LoopPageQueue:
+    """Bounded page queue from a producer thread to the event loop.
+
+    ``put`` is called on the producer thread with ``queue.Queue`` semantics
+    (blocks while ``maxsize`` pages are waiting, raises ``queue.Full`` on
+    timeout) and hands each page over with ``call_soon_threadsafe``; the
+    consumer awaits :meth:`get` without tying up an executor thread.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._slots = threading.Semaphore(maxsize)
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None) -> None:
+        if not self._slots.acquire(block, timeout):
+            raise queue.Full
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            self._slots.release()  # event loop closed; nobody is listening
+
+    async def get(self):
+        item = await self._queue.get()
+        self._slots.release()
+        return item
+
+    def get_nowait(self):
+        item = self._queue.get_nowait()
+        self._slots.release()
+        return item
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+
+class PlaylistStream:
+    """Async consumer for a playlist's entries, page by page.
+
+    Nothing is fetched until the first :meth:`next_page` call, so a playlist
+    queued behind another one costs no worker until its turn. The first page
+    comes from a short :func:`ytdl_jobs.playlist_head` job on the interactive
+    lane; the rest is enumerated by :func:`ytdl_jobs.stream_playlist` on the
+    background lane, which blocks on a small bounded queue so at most
+    ``max_pages`` pages are buffered no matter how long the playlist is. In
+    thread mode pages are handed to the event loop directly; pass a
+    multiprocessing manager when the executor uses worker processes so the
+    queue and stop flag can cross the process boundary (pages are then polled
+    from an executor thread).
+    """
+
+    def __init__(
+        self,
+        executor,
+        url: str,
+        limit: int = 0,
+        guild_id: Optional[str] = None,
+        manager=None,
+        max_pages: int = 4,
+        poll_interval: float = 0.5,
+        first_page_size: int = 10,
+        page_size: int = 50,
+    ):
+        self.url = url
+        self.limit = limit
+        self.guild_id = guild_id
+        self.poll_interval = poll_interval
+        self.first_page_size = min(first_page_size, limit) if limit else first_page_size
+        self.page_size = page_size
+        self._executor = executor
+        if manager is not None:
+            self._pages = manager.Queue(maxsize=max_pages)
+            self._stop = manager.Event()
+        else:
+            self._pages = _LoopPageQueue(asyncio.get_running_loop(), max_pages)
+            self._stop = threading.Event()
+        self._head: Optional[asyncio.Future] = None
+        self._job: Optional[asyncio.Future] = None
+        self.received = 0
+        self.done = False
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        for job in (self._head, self._job):
+            if job is not None and job.done() and not job.cancelled() and job.exception():
+                return job.exception()
+        return None
+
+    async def _first_page(self, timeout: Optional[float]) -> Optional[List[Dict[str, Any]]]:
+        self._head = asyncio.ensure_future(
+            self._executor.submit(
+                ytdl_jobs.playlist_head,
+                self.url,
+                self.first_page_size,
+                lane=HIGH,
+                guild_id=self.guild_id,
+            )
+        )
+        try:
+            page = await asyncio.wait_for(self._head, timeout)
+        except BaseException:
+            self.done = True
+            raise
+        if len(page) < self.first_page_size or (self.limit and len(page) >= self.limit):
+            self.done = True
+        elif not self.done:
+            self._job = asyncio.ensure_future(
+                self._executor.submit(
+                    ytdl_jobs.stream_playlist,
+                    self.url,
+                    self._pages,
+                    self._stop,
+                    self.limit - len(page) if self.limit else 0,
+                    page_size=self.page_size,
+                    first_page_size=self.page_size,
+                    skip=len(page),
+                    lane=LOW,
+                    guild_id=self.guild_id,
+                )
+            )
+        if not page:
+            self.done = True
+            return None
+        self.received += len(page)
+        return page
+
+    async def next_page(self, timeout: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """Next page of ``target/title/duration`` entries, or None once exhausted."""
+        if self._head is None and not self.done:
+            return await self._first_page(timeout)
+        if self.done:
+            return None
+        if isinstance(self._pages, _LoopPageQueue):
+            page = await self._next_from_loop(timeout)
+        else:
+            page = await self._next_from_proxy(timeout)
+        if page is None:
+            self.done = True
+            return None
+        self.received += len(page)
+        return page
+
+    async def _next_from_loop(self, timeout: Optional[float]):
+        getter = asyncio.ensure_future(self._pages.get())
+        try:
+            done, _ = await asyncio.wait(
+                {getter, self._job}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter in done:
+                return getter.result()
+            if not done:
+                raise asyncio.TimeoutError
+            # The producer's end marker is scheduled before its job completes, so
+            # a finished job with nothing queued died without delivering one.
+            return None
+        finally:
+            if not getter.done():
+                getter.cancel()
+
+    async def _next_from_proxy(self, timeout: Optional[float]):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        get = functools.partial(self._pages.get, True, self.poll_interval)
+        while not self.done:
+            try:
+                return await loop.run_in_executor(None, get)
+            except queue.Empty:
+                if (self._job is None or self._job.done()) and self._pages.empty():
+                    # Producer died without delivering its end marker.
+                    return None
+                if deadline is not None and loop.time() >= deadline:
+                    raise asyncio.TimeoutError
+        return None
+
+    def close(self) -> None:
+        """Abandon the stream; the producer notices within one poll interval."""
+        self.done = True
+        if self._head is not None and not self._head.done():
+            self._head.cancel()
+        try:
+            self._stop.set()
+        except Exception:
+            pass
+        # Drain so a producer blocked on a full queue can observe the stop flag.
+        try:
+            while True:
+                self._pages.get_nowait()
+        except Exception:
+            pass
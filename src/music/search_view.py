@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import discord
+
+# Discord's limit on select option labels and descriptions.
+_OPTION_TEXT_LIMIT = 100
+
+
+class SearchResultsView(discord.ui.View):
+    """Select menu sent with ``!search`` results in the same message.
+
+    Only ``author_id`` may choose. After ``await view.wait()`` the chosen result
+    index is in :attr:`selection`, or None if the view timed out.
+    """
+
+    def __init__(
+        self,
+        author_id: int,
+        labels: List[str],
+        descriptions: Optional[List[Optional[str]]] = None,
+        timeout: float = 30.0,
+    ):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.selection: Optional[int] = None
+        descriptions = descriptions or [None] * len(labels)
+        self.menu = discord.ui.Select(
+            placeholder="Choose a result to play",
+            options=[
+                discord.SelectOption(
+                    label=label[:_OPTION_TEXT_LIMIT],
+                    value=str(index),
+                    description=description[:_OPTION_TEXT_LIMIT] if description else None,
+                )
+                for index, (label, description) in enumerate(zip(labels, descriptions))
+            ],
+        )
+        self.menu.callback = self._on_select
+        self.add_item(self.menu)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.author_id:
+            return True
+        await interaction.response.send_message(
+            "Only the person who searched can choose a result.", ephemeral=True
+        )
+        return False
+
+    async def _on_select(self, interaction: discord.Interaction) -> None:
+        self.selection = int(self.menu.values[0])
+        self.stop()
+        # Acknowledges the interaction and drops the menu in one call.
+        await interaction.response.edit_message(view=None)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+DEFAULT_SETTINGS: Dict[str, Any] = {"volume": 1.0}
+
+Loader = Callable[[], Awaitable[Dict[str, Dict[str, Any]]]]
+Saver = Callable[..., Awaitable[None]]
+
+
+class GuildSettingsStore:
+    """Per-guild music preferences served from memory and written behind.
+
+    ``set`` only updates the in-memory copy and marks the guild dirty; dirty
+    guilds are written together by ``save`` (one document update per guild)
+    ``delay`` seconds after the first change, so bursts of ``!volume`` calls
+    become one batched write. ``close`` flushes whatever is still pending.
+    """
+
+    def __init__(self, load: Loader, save: Saver, delay: float = 2.0, logger=None):
+        self._load = load
+        self._save = save
+        self.delay = delay
+        self.logger = logger
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        self.writes = 0
+        self.batched = 0
+        self.failures = 0
+
+    def get(self, guild_id: str, key: str) -> Any:
+        value = self._settings.get(guild_id, {}).get(key)
+        return DEFAULT_SETTINGS.get(key) if value is None else value
+
+    def set(self, guild_id: str, key: str, value: Any) -> None:
+        self._settings.setdefault(guild_id, {})[key] = value
+        self._dirty.add(guild_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def load(self, legacy_path: Optional[str] = None) -> None:
+        """Read all stored settings, importing a legacy ``volumes.json`` once."""
+        stored_ok = True
+        try:
+            self._settings = {gid: dict(doc) for gid, doc in (await self._load()).items()}
+        except Exception as e:
+            stored_ok = False
+            self._log("error", f"Failed to load music settings: {e}")
+
+        if not legacy_path or not os.path.exists(legacy_path):
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            legacy = await loop.run_in_executor(None, _read_json, legacy_path)
+        except Exception as e:
+            self._log("error", f"Failed to read legacy volumes file {legacy_path}: {e}")
+            return
+        imported = {
+            str(gid): {"volume": float(volume)}
+            for gid, volume in legacy.items()
+            if isinstance(volume, (int, float))
+        }
+        for gid, settings in imported.items():
+            # Values already in the store are newer than the file.
+            self._settings.setdefault(gid, {}).setdefault("volume", settings["volume"])
+        if not stored_ok:
+            return  # keep the file; try the import again next start
+        try:
+            await self._save(imported, overwrite=False)
+            await loop.run_in_executor(None, os.replace, legacy_path, legacy_path + ".imported")
+        except Exception as e:
+            self._log("error", f"Failed to import legacy volumes file: {e}")
+            return
+        self._log("info", f"Imported {len(imported)} guild volume(s) from {legacy_path}.")
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.delay)
+        # Shielded: close() cancelling the timer must not abort a write in progress.
+        await asyncio.shield(self.flush())
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            batch = {gid: dict(self._settings.get(gid, {})) for gid in dirty}
+            try:
+                await self._save(batch)
+            except Exception as e:
+                # Retried with the next change or on close.
+                self._dirty |= dirty
+                self.failures += 1
+                self._log("error", f"Failed to save music settings: {e}")
+                return
+            self.writes += 1
+            self.batched += len(batch)
+
+    async def close(self) -> None:
+        task, self._flush_task = self._flush_task, None
+        if task and not task.done():
+            task.cancel()
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "guilds": len(self._settings),
+            "pending": len(self._dirty),
+            "writes": self.writes,
+            "batched": self.batched,
+            "failures": self.failures,
+        }
+
+    def _log(self, level: str, message: str) -> None:
+        if self.logger is not None:
+            getattr(self.logger, level)(message)
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data if isinstance(data, dict) else {}
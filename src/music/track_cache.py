@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Keys worth keeping from a yt-dlp info dict; the rest (formats, thumbnails,
+# captions, ...) can weigh hundreds of KB per entry.
+TRACK_INFO_KEYS = (
+    "id",
+    "title",
+    "url",
+    "duration",
+    "webpage_url",
+    "original_url",
+    "uploader",
+    "thumbnail",
+    "extractor_key",
+    "acodec",
+    "abr",
+    "asr",
+    "ext",
+)
+
+# Long-lived fields persisted across restarts; stream URLs expire and stay in memory.
+TRACK_METADATA_KEYS = (
+    "title",
+    "duration",
+    "uploader",
+    "thumbnail",
+    "webpage_url",
+    "extractor_key",
+)
+
+_YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_YOUTUBE_HOSTS = {
+    "youtube.com",
+    "www.youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+    "www.youtube-nocookie.com",
+}
+_EXPIRE_PATH_RE = re.compile(r"/expire/(\d+)")
+
+
+def trim_track_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a small copy of a yt-dlp info dict with only the fields we use."""
+    return {key: info[key] for key in TRACK_INFO_KEYS if info.get(key) is not None}
+
+
+def track_metadata(info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Persistable metadata for a resolved track, keyed by ``track_id``."""
+    key = cache_key_for_info(info)
+    if not key:
+        return None
+    doc = {key_: info[key_] for key_ in TRACK_METADATA_KEYS if info.get(key_) is not None}
+    doc["track_id"] = key
+    return doc
+
+
+def canonical_video_id(target: Optional[str]) -> Optional[str]:
+    """Extract a YouTube video ID from a URL or bare ID, or None if not YouTube."""
+    if not target:
+        return None
+    target = target.strip()
+    if _YOUTUBE_ID_RE.match(target):
+        return target
+
+    parsed = urlparse(target)
+    host = (parsed.hostname or "").lower()
+    if host in ("youtu.be", "www.youtu.be"):
+        candidate = parsed.path.lstrip("/").split("/", 1)[0]
+        return candidate if _YOUTUBE_ID_RE.match(candidate) else None
+    if host not in _YOUTUBE_HOSTS:
+        return None
+
+    if parsed.path == "/watch":
+        candidate = parse_qs(parsed.query).get("v", [None])[0]
+        return candidate if candidate and _YOUTUBE_ID_RE.match(candidate) else None
+
+    parts = [part for part in parsed.path.split("/") if part]
+    if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+        return parts[1] if _YOUTUBE_ID_RE.match(parts[1]) else None
+    return None
+
+
+def cache_key_for_target(target: Optional[str]) -> Optional[str]:
+    """Cache key for a request target before extraction (None for searches)."""
+    video_id = canonical_video_id(target)
+    if video_id:
+        return video_id
+    if target and re.match(r"https?://", target):
+        return target.strip()
+    return None
+
+
+def inflight_key_for_target(target: Optional[str]) -> Optional[str]:
+    """Key for coalescing concurrent extractions of the same URL, ID or search query."""
+    key = cache_key_for_target(target)
+    if key:
+        return key
+    match = re.match(r"^ytsearch\d*:(.*)$", (target or "").strip(), re.S)
+    if match and match.group(1).strip():
+        return "search:" + " ".join(match.group(1).lower().split())
+    return None
+
+
+def cache_key_for_info(info: Dict[str, Any]) -> Optional[str]:
+    """Cache key for an extracted info dict."""
+    if (info.get("extractor_key") or "").lower().startswith("youtube") and info.get("id"):
+        return info["id"]
+    return (
+        canonical_video_id(info.get("webpage_url"))
+        or info.get("webpage_url")
+        or info.get("original_url")
+    )
+
+
+def stream_url_expiry(url: Optional[str]) -> Optional[float]:
+    """Read the unix expiry time from a googlevideo stream URL, if present."""
+    if not url:
+        return None
+    parsed = urlparse(url)
+    expire = parse_qs(parsed.query).get("expire", [None])[0]
+    if expire is None:
+        match = _EXPIRE_PATH_RE.search(parsed.path)
+        expire = match.group(1) if match else None
+    try:
+        return float(expire) if expire is not None else None
+    except ValueError:
+        return None
+
+
+class TrackInfoCache:
+    """In-process LRU cache of resolved track info, expiring with the stream URL."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        default_ttl: float = 1800.0,
+        refresh_margin: float = 600.0,
+        expiry_skew: float = 60.0,
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.expiry_skew = expiry_skew
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expires_at(self, info: Dict[str, Any]) -> float:
+        expiry = stream_url_expiry(info.get("url"))
+        if expiry is None:
+            return time.time() + self.default_ttl
+        return expiry - self.expiry_skew
+
+    def get(self, key: Optional[str]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Return (info, needs_refresh). info is None on a miss or expired entry."""
+        if not key:
+            return None, False
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        info, expires_at = entry
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None, False
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(info), remaining <= self.refresh_margin
+
+    def put(self, info: Dict[str, Any], *aliases: Optional[str]) -> Optional[str]:
+        """Store a resolved info dict under its canonical key; returns the key."""
+        key = cache_key_for_info(info) or next((a for a in aliases if a), None)
+        if not key:
+            return None
+        self._entries[key] = (trim_track_info(info), self._expires_at(info))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return key
+
+    def expires_in(self, key: Optional[str]) -> Optional[float]:
+        """Seconds until the cached stream URL for key expires, or None if absent."""
+        entry = self._entries.get(key) if key else None
+        if entry is None:
+            return None
+        return entry[1] - time.time()
+
+    def invalidate(self, key: Optional[str]) -> None:
+        if key:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+# Failure classes remembered by the negative cache.
+UNAVAILABLE = "unavailable"  # removed, private, region/age locked
+TIMEOUT = "timeout"
+FORMAT = "format"  # extracted, but no playable audio stream
+
+# Unavailable videos rarely come back; timeouts are often transient.
+NEGATIVE_TTLS = {UNAVAILABLE: 6 * 3600.0, FORMAT: 1800.0, TIMEOUT: 300.0}
+
+_UNAVAILABLE_MARKERS = (
+    "video unavailable",
+    "private video",
+    "not available",
+    "has been removed",
+    "was removed",
+    "account associated with this video has been terminated",
+    "blocked it in your country",
+    "not made this video available in your country",
+    "sign in to confirm your age",
+    "members-only",
+    "join this channel",
+    "copyright",
+    "premieres in",
+    "does not exist",
+    "http error 404",
+)
+# Throttling and other temporary refusals; YouTube words its rate limit as
+# "Video unavailable. This content isn't available, try again later.", so
+# these are checked before the unavailable markers.
+_TRANSIENT_MARKERS = (
+    "try again later",
+    "rate-limit",
+    "rate limit",
+    "too many requests",
+    "http error 429",
+)
+_FORMAT_MARKERS = (
+    "requested format is not available",
+    "no video formats found",
+    "no audio formats",
+)
+
+
+class TrackFailedError(Exception):
+    """Extraction failure with a known class, as recorded by :class:`NegativeTrackCache`."""
+
+    def __init__(self, failure: str, message: str):
+        super().__init__(message)
+        self.failure = failure
+
+
+def classify_extraction_error(error: BaseException) -> Optional[str]:
+    """Failure class for an extraction error, or None when it may be transient."""
+    if isinstance(error, TrackFailedError):
+        return error.failure
+    message = str(error).lower()
+    if any(marker in message for marker in _TRANSIENT_MARKERS):
+        return None
+    if any(marker in message for marker in _FORMAT_MARKERS):
+        return FORMAT
+    if any(marker in message for marker in _UNAVAILABLE_MARKERS):
+        return UNAVAILABLE
+    return None
+
+
+class NegativeTrackCache:
+    """Targets that recently failed to extract, keyed like :class:`TrackInfoCache`.
+
+    Entries expire after a TTL that depends on the failure class, so a dead
+    video in a playlist fails instantly instead of costing a full extraction
+    (and its retries) each time the playlist is queued.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.ttls = dict(NEGATIVE_TTLS, **(ttls or {}))
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.recorded: Dict[str, int] = {failure: 0 for failure in self.ttls}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Optional[str]) -> Optional[Tuple[str, str]]:
+        """(failure, message) if ``key`` failed recently, else None."""
+        entry = self._entries.get(key) if key else None
+        if entry is None:
+            return None
+        failure, message, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self.hits += 1
+        return failure, message
+
+    def put(self, key: Optional[str], failure: str, message: str) -> None:
+        if not key or failure not in self.ttls:
+            return
+        self._entries[key] = (failure, message, time.time() + self.ttls[failure])
+        self._entries.move_to_end(key)
+        self.recorded[failure] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: Optional[str]) -> None:
+        if key:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        live: Dict[str, int] = {failure: 0 for failure in self.ttls}
+        for failure, _, expires_at in self._entries.values():
+            if expires_at > now:
+                live[failure] += 1
+        return {"entries": live, "hits": self.hits, "recorded": dict(self.recorded)}
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import sys
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+UNKNOWN_TITLE = "Unknown Title"
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Track:
+    """One queued or playing track.
+
+    Titles, page URLs and codec names repeat across guilds queueing the same
+    playlists, so they are interned; the lowercase title is kept alongside for
+    text matching in :meth:`TrackQueue.find`.
+    """
+
+    __slots__ = (
+        "_title",
+        "title_lower",
+        "url",
+        "duration",
+        "webpage_url",
+        "acodec",
+        "abr",
+        "uploader",
+        "thumbnail",
+    )
+
+    def __init__(
+        self,
+        title: Optional[str] = None,
+        url: Optional[str] = None,
+        duration: Optional[float] = None,
+        webpage_url: Optional[str] = None,
+        acodec: Optional[str] = None,
+        abr: Optional[float] = None,
+        uploader: Optional[str] = None,
+        thumbnail: Optional[str] = None,
+    ):
+        self.title = title
+        self.url = url
+        self.duration = duration
+        self.webpage_url = _intern(webpage_url)
+        self.acodec = _intern(acodec)
+        self.abr = abr
+        self.uploader = _intern(uploader)
+        self.thumbnail = thumbnail
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    @title.setter
+    def title(self, value: Optional[str]) -> None:
+        self._title = _intern(value or UNKNOWN_TITLE)
+        self.title_lower = _intern(self._title.lower())
+
+    @property
+    def has_title(self) -> bool:
+        return self._title != UNKNOWN_TITLE
+
+    @classmethod
+    def from_entry(cls, entry: Dict[str, Any]) -> "Track":
+        """Unresolved track from a flat playlist entry or search result."""
+        return cls(
+            title=entry.get("title"),
+            duration=entry.get("duration"),
+            webpage_url=(
+                entry.get("target")
+                or entry.get("webpage_url")
+                or entry.get("url")
+                or entry.get("id")
+            ),
+        )
+
+    @classmethod
+    def from_info(cls, info: Dict[str, Any], fallback_url: Optional[str] = None) -> "Track":
+        """Resolved track from an extracted info dict."""
+        return cls(
+            title=info.get("title"),
+            url=info.get("url"),
+            duration=info.get("duration"),
+            webpage_url=info.get("webpage_url") or fallback_url or info.get("url"),
+            acodec=info.get("acodec"),
+            abr=info.get("abr"),
+            uploader=info.get("uploader"),
+            thumbnail=info.get("thumbnail"),
+        )
+
+    def to_entry(self) -> Dict[str, Any]:
+        """Flat entry that :meth:`from_entry` turns back into an unresolved track."""
+        return {
+            "webpage_url": self.webpage_url,
+            "title": self._title if self.has_title else None,
+            "duration": self.duration,
+        }
+
+    def update_from_info(self, info: Dict[str, Any]) -> None:
+        """Take a fresh stream URL and any metadata the extraction filled in."""
+        if info.get("url"):
+            self.url = info["url"]
+        if info.get("title"):
+            self.title = info["title"]
+        for key in ("duration", "abr", "thumbnail"):
+            if info.get(key):
+                setattr(self, key, info[key])
+        for key in ("webpage_url", "acodec", "uploader"):
+            if info.get(key):
+                setattr(self, key, _intern(info[key]))
+
+    def __repr__(self) -> str:
+        return f"<Track {self._title!r} {self.webpage_url!r}>"
+
+
+class TrackQueue:
+    """Deque of :class:`Track` with O(1) head/tail operations.
+
+    Positional removal and moves rotate the deque from whichever end is closer,
+    so they cost O(min(i, n - i)) instead of shifting a list.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, tracks: Iterable[Track] = ()):
+        self._items: Deque[Track] = deque(tracks)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self) -> Iterator[Track]:
+        return iter(self._items)
+
+    def __getitem__(self, index: int) -> Track:
+        return self._items[index]
+
+    def head(self, count: int) -> List[Track]:
+        return list(islice(self._items, count))
+
+    def peek(self) -> Optional[Track]:
+        return self._items[0] if self._items else None
+
+    def append(self, track: Track) -> None:
+        self._items.append(track)
+
+    def extend(self, tracks: Iterable[Track]) -> None:
+        self._items.extend(tracks)
+
+    def popleft(self) -> Track:
+        return self._items.popleft()
+
+    def pop(self) -> Track:
+        return self._items.pop()
+
+    def remove_at(self, index: int) -> Track:
+        """Remove and return the track at ``index`` (negative indexes allowed)."""
+        items = self._items
+        if index < 0:
+            index += len(items)
+        if not 0 <= index < len(items):
+            raise IndexError("queue index out of range")
+        track = items[index]
+        del items[index]
+        return track
+
+    def move(self, source: int, destination: int) -> Track:
+        """Move the track at ``source`` so it ends up at ``destination``."""
+        track = self.remove_at(source)
+        self._items.insert(max(0, min(destination, len(self._items))), track)
+        return track
+
+    def find(self, text: str) -> int:
+        """Index of the first track whose title contains ``text`` (case-insensitive), or -1.
+
+        A linear scan over the precomputed ``title_lower`` values: matching is by
+        substring and the result is a position, so a title -> track index would
+        not avoid the walk and would cost a dict update on every queue change.
+        """
+        needle = text.lower()
+        for index, track in enumerate(self._items):
+            if needle in track.title_lower:
+                return index
+        return -1
+
+    def clear(self) -> None:
+        self._items.clear()
@@ -0,0 +1,300 @@
+"""Blocking yt-dlp jobs run by the extraction executor.
+
+Every function here is module-level and returns trimmed, picklable dicts so the
+same jobs can run on a thread pool inside the bot or on a process pool whose
+workers call :func:`init_worker` once at start-up.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from music.track_cache import trim_track_info
+from music.ytdl_pool import YoutubeDLPool
+
+# Updated YDL_OPTIONS with better format selection and error handling
+YDL_OPTIONS = {
+    "format": "bestaudio[ext=webm]/bestaudio[ext=m4a]/bestaudio/best",
+    "noplaylist": False,
+    "quiet": True,
+    "force-ipv4": True,
+    "extract_flat": "in_playlist",
+    "ignoreerrors": True,
+    "nocheckcertificate": True,
+    "extractor_retries": 3,
+    "skip_download": True,
+    "no_warnings": True,
+    # Remove complex format_sort that might be causing issues
+    # YouTube specific options - simplified
+    "youtube_include_dash_manifest": False,
+    "prefer_free_formats": True,
+    # Add cookies support if needed
+    "cookiefile": None,
+    # Add user agent
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+}
+
+# Option profiles for pooled YoutubeDL instances; each profile keeps its own
+# long-lived instances so extractor state and player-JS solutions are reused.
+_TRACK_PROFILE_BASE = {
+    **YDL_OPTIONS,
+    "noplaylist": True,
+    # Force full extraction so we can resolve stream URLs from searches/playlists
+    "extract_flat": False,
+    # Let extractor errors raise so the cog can tell a dead video from a network
+    # hiccup; with ignoreerrors yt-dlp only logs them and returns None.
+    "ignoreerrors": False,
+    # Add timeout to prevent hanging
+    "socket_timeout": 30,
+}
+YDL_PROFILES = {
+    "search": {**YDL_OPTIONS, "noplaylist": True, "socket_timeout": 30},
+    "playlist": {
+        **YDL_OPTIONS,
+        "noplaylist": False,
+        "extract_flat": True,  # enumerate entries quickly
+        "socket_timeout": 30,
+    },
+    # Permissive selector so yt-dlp never rejects a video; the stream we play is
+    # picked from the returned formats list by select_audio_format().
+    "track": {**_TRACK_PROFILE_BASE, "format": "bestaudio/best/worst*"},
+    # Same extraction through other YouTube player clients; used for hedged
+    # requests so a slow or throttled default client is not raced against itself.
+    "track_hedge": {
+        **_TRACK_PROFILE_BASE,
+        "format": "bestaudio/best/worst*",
+        "extractor_args": {"youtube": {"player_client": ["ios", "mweb"]}},
+    },
+}
+
+_pool: Optional[YoutubeDLPool] = None
+
+
+def configure(profiles: Dict[str, Dict[str, Any]], cachedir: Optional[str]) -> YoutubeDLPool:
+    """Install the YoutubeDL pool used by jobs in this process."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+    _pool = YoutubeDLPool(profiles, cachedir=cachedir)
+    return _pool
+
+
+def init_worker(profiles: Dict[str, Dict[str, Any]], cachedir: Optional[str]) -> None:
+    """Process-pool initializer: import yt-dlp and pre-warm the pool."""
+    import yt_dlp
+
+    yt_dlp.utils.bug_reports_message = lambda *args, **kwargs: ""
+    configure(profiles, cachedir).warm()
+
+
+def warm() -> int:
+    """Pre-warm the pool; returns the worker PID so callers can count workers."""
+    if _pool is not None:
+        _pool.warm()
+    return os.getpid()
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats() if _pool is not None else None
+
+
+def _require_pool() -> YoutubeDLPool:
+    if _pool is None:
+        raise RuntimeError("yt-dlp job pool is not configured.")
+    return _pool
+
+
+def _entry_summary(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title") or "Unknown Title",
+        "duration": entry.get("duration"),
+        "url": entry.get("url"),
+        "webpage_url": entry.get("webpage_url"),
+    }
+
+
+def _has_audio(fmt: Dict[str, Any]) -> bool:
+    return fmt.get("acodec") != "none"
+
+
+def _is_audio_only(fmt: Dict[str, Any]) -> bool:
+    return fmt.get("vcodec") == "none" and fmt.get("acodec") not in (None, "none")
+
+
+def _bitrate(fmt: Dict[str, Any]) -> float:
+    return fmt.get("abr") or fmt.get("tbr") or 0
+
+
+def select_audio_format(formats: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Pick a stream locally: webm/opus > m4a > best muxed <=720p > worst."""
+    usable = [
+        fmt
+        for fmt in formats
+        if fmt.get("url")
+        and not fmt["url"].startswith("file://")
+        and fmt.get("protocol") != "mhtml"  # storyboards
+    ]
+    audio_only = [fmt for fmt in usable if _is_audio_only(fmt)]
+
+    opus = [
+        fmt
+        for fmt in audio_only
+        if fmt.get("ext") == "webm" or (fmt.get("acodec") or "").startswith("opus")
+    ]
+    if opus:
+        return max(opus, key=_bitrate)
+    m4a = [fmt for fmt in audio_only if fmt.get("ext") == "m4a"]
+    if m4a:
+        return max(m4a, key=_bitrate)
+    if audio_only:
+        return max(audio_only, key=_bitrate)
+
+    muxed = [fmt for fmt in usable if _has_audio(fmt)]
+    capped = [fmt for fmt in muxed if (fmt.get("height") or 0) <= 720]
+    if capped:
+        return max(capped, key=lambda fmt: (fmt.get("height") or 0, _bitrate(fmt)))
+    if muxed:
+        return min(muxed, key=lambda fmt: (fmt.get("height") or 0, _bitrate(fmt)))
+    # Video-only streams would only fail later at ffmpeg's -map 0:a:0.
+    return None
+
+
+def _with_selected_stream(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Trimmed info with the chosen stream in ``url``; no ``url`` if nothing is playable."""
+    chosen = select_audio_format(info.get("formats") or [])
+    if chosen is None:
+        resolved = trim_track_info(info)
+        stream_url = resolved.get("url")
+        if (
+            not stream_url
+            or stream_url.startswith("file://")
+            or not _has_audio(info)  # the profile's worst* fallback picked video-only
+        ):
+            resolved.pop("url", None)
+        return resolved
+
+    resolved = trim_track_info(info)
+    resolved["url"] = chosen["url"]
+    for key in ("acodec", "abr", "asr", "ext"):
+        resolved.pop(key, None)
+        if chosen.get(key) is not None:
+            resolved[key] = chosen[key]
+    return resolved
+
+
+def extract_track(target: str, profile: str = "track") -> Optional[Dict[str, Any]]:
+    """One full extraction of a URL, ID or ``ytsearch1:`` query with a locally chosen stream."""
+    data = _require_pool().extract_info(profile, target)
+    if not data:
+        return None
+    if data.get("entries"):
+        # Search results are already fully extracted; no second round trip needed.
+        data = next((entry for entry in data["entries"] if entry), None)
+        if not data:
+            return None
+    return _with_selected_stream(data)
+
+
+def _playlist_entry(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    entry_target = entry.get("webpage_url") or entry.get("url") or entry.get("id")
+    if not entry_target:
+        return None
+    return {
+        "target": entry_target,
+        "title": entry.get("title") or "Unknown Title",
+        "duration": entry.get("duration"),
+    }
+
+
+def _iter_entries(info: Optional[Dict[str, Any]]) -> Iterator[Any]:
+    entries = (info or {}).get("entries") or []
+    try:
+        return iter(entries)
+    except TypeError:
+        # PagedList-style containers
+        return iter(entries.getslice())
+
+
+def _put_page(pages, stop, page, poll: float = 1.0) -> bool:
+    """Blocking put that gives up once the consumer has signalled stop."""
+    while not stop.is_set():
+        try:
+            pages.put(page, True, poll)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _playlist_entries(ydl, url: str) -> Iterator[Dict[str, Any]]:
+    """Entry summaries of a playlist, fetched lazily page by page as iterated."""
+    info = ydl.extract_info(url, download=False, process=False)
+    for _ in range(3):
+        if not info or info.get("_type") not in ("url", "url_transparent"):
+            break
+        info = ydl.extract_info(
+            info["url"], download=False, process=False, ie_key=info.get("ie_key")
+        )
+    for entry in _iter_entries(info):
+        summary = _playlist_entry(entry) if entry else None
+        if summary is not None:
+            yield summary
+
+
+def playlist_head(url: str, count: int) -> List[Dict[str, Any]]:
+    """The first ``count`` entries of a playlist; a short, interactive job."""
+    with _require_pool().checkout("playlist") as ydl:
+        return list(islice(_playlist_entries(ydl, url), count))
+
+
+def stream_playlist(
+    url: str,
+    pages,
+    stop,
+    limit: int = 0,
+    page_size: int = 50,
+    first_page_size: int = 10,
+    skip: int = 0,
+) -> int:
+    """Enumerate a playlist lazily, handing pages of entries to ``pages`` as they arrive.
+
+    ``pages`` is a bounded queue (``queue.Queue`` or a Manager proxy) and ``stop``
+    an event the consumer sets to abandon the stream. The first ``skip`` entries
+    (already delivered by :func:`playlist_head`) are passed over. A final ``None``
+    marks the end. Returns the number of entries delivered.
+    """
+    sent = 0
+    try:
+        with _require_pool().checkout("playlist") as ydl:
+            page: List[Dict[str, Any]] = []
+            target_size = first_page_size
+            for summary in islice(_playlist_entries(ydl, url), skip, None):
+                if stop.is_set():
+                    return sent
+                page.append(summary)
+                reached_limit = bool(limit) and sent + len(page) >= limit
+                if len(page) >= target_size or reached_limit:
+                    if not _put_page(pages, stop, page):
+                        return sent
+                    sent += len(page)
+                    page = []
+                    target_size = page_size
+                if reached_limit:
+                    break
+            if page and _put_page(pages, stop, page):
+                sent += len(page)
+    finally:
+        _put_page(pages, stop, None)
+    return sent
+
+
+def search(query: str, count: int = 5) -> List[Dict[str, Any]]:
+    """Flat YouTube search returning up to ``count`` entry summaries."""
+    info = _require_pool().extract_info("search", f"ytsearch{count}:{query}")
+    if not info:
+        return []
+    return [_entry_summary(entry) for entry in info.get("entries") or [] if entry][:count]
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import yt_dlp as youtube_dl
+
+
+class YoutubeDLPool:
+    """Thread-safe pool of long-lived YoutubeDL instances keyed by option profile.
+
+    Reusing instances keeps yt-dlp's HTTP connections, extractor objects and the
+    in-memory player-JS signature solutions alive between calls; the shared
+    on-disk ``cachedir`` keeps the decrypted player functions across restarts.
+    """
+
+    def __init__(
+        self,
+        profiles: Dict[str, Dict[str, Any]],
+        cachedir: Optional[str] = None,
+        max_idle: int = 4,
+        max_uses: int = 500,
+    ):
+        self.cachedir = cachedir
+        if cachedir:
+            os.makedirs(cachedir, exist_ok=True)
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self._profiles = {
+            name: self._with_cachedir(opts) for name, opts in profiles.items()
+        }
+        self._idle: Dict[str, List[Any]] = {name: [] for name in self._profiles}
+        self._uses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.reused = 0
+        self.retired = 0
+
+    def _with_cachedir(self, opts: Dict[str, Any]) -> Dict[str, Any]:
+        opts = dict(opts)
+        if self.cachedir:
+            opts["cachedir"] = self.cachedir
+        return opts
+
+    @property
+    def profiles(self) -> List[str]:
+        return list(self._profiles)
+
+    def _create(self, profile: str):
+        ydl = youtube_dl.YoutubeDL(dict(self._profiles[profile]))
+        with self._lock:
+            self.created += 1
+            self._uses[id(ydl)] = 0
+        return ydl
+
+    def _retire(self, ydl) -> None:
+        with self._lock:
+            self._uses.pop(id(ydl), None)
+            self.retired += 1
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def checkout(self, profile: str) -> Iterator[Any]:
+        """Borrow an instance for exclusive use by the calling thread."""
+        if profile not in self._profiles:
+            raise KeyError(f"Unknown yt-dlp profile: {profile}")
+
+        with self._lock:
+            idle = self._idle[profile]
+            ydl = idle.pop() if idle else None
+            if ydl is not None:
+                self.reused += 1
+        if ydl is None:
+            ydl = self._create(profile)
+
+        healthy = False
+        try:
+            yield ydl
+            healthy = True
+        finally:
+            with self._lock:
+                uses = self._uses.get(id(ydl), 0) + 1
+                self._uses[id(ydl)] = uses
+                keep = (
+                    healthy
+                    and uses < self.max_uses
+                    and len(self._idle[profile]) < self.max_idle
+                )
+                if keep:
+                    self._idle[profile].append(ydl)
+            if not keep:
+                self._retire(ydl)
+
+    def extract_info(self, profile: str, target: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Run ``extract_info`` on a pooled instance. Blocking; call from an executor."""
+        kwargs.setdefault("download", False)
+        with self.checkout(profile) as ydl:
+            return ydl.extract_info(target, **kwargs)
+
+    def warm(self) -> None:
+        """Create one idle instance per profile and load the YouTube extractors."""
+        for profile in self._profiles:
+            with self.checkout(profile) as ydl:
+                try:
+                    ydl.get_info_extractor("Youtube")
+                    ydl.get_info_extractor("YoutubeTab")
+                    ydl.get_info_extractor("YoutubeSearch")
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [ydl for instances in self._idle.values() for ydl in instances]
+            for instances in self._idle.values():
+                instances.clear()
+        for ydl in idle:
+            self._retire(ydl)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "idle": {name: len(items) for name, items in self._idle.items()},
+                "created": self.created,
+                "reused": self.reused,
+                "retired": self.retired,
+            }
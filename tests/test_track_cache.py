@@ -0,0 +1,36 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from music.track_cache import (  # noqa: E402
+    FORMAT,
+    UNAVAILABLE,
+    classify_extraction_error,
+)
+
+
+class ClassifyExtractionErrorTests(unittest.TestCase):
+    def test_rate_limit_is_not_cached_as_unavailable(self):
+        error = Exception(
+            "ERROR: [youtube] abc: Video unavailable. "
+            "This content isn't available, try again later."
+        )
+        self.assertIsNone(classify_extraction_error(error))
+
+    def test_http_429_is_transient(self):
+        error = Exception("ERROR: [youtube] abc: HTTP Error 429: Too Many Requests")
+        self.assertIsNone(classify_extraction_error(error))
+
+    def test_removed_video_is_unavailable(self):
+        error = Exception("ERROR: [youtube] abc: Video unavailable. This video has been removed")
+        self.assertEqual(classify_extraction_error(error), UNAVAILABLE)
+
+    def test_missing_format(self):
+        error = Exception("ERROR: [youtube] abc: Requested format is not available")
+        self.assertEqual(classify_extraction_error(error), FORMAT)
+
+
+if __name__ == "__main__":
+    unittest.main()